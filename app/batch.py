@@ -0,0 +1,191 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import asyncio
+import logging
+import time
+import uuid
+
+from . import config
+from .changes import RunStore
+from .resilience import ProductGoneError
+from .resource_blocking import LoadOptions
+from .results import ResultStore
+from .service import ScrapeService
+
+logger = logging.getLogger(__name__)
+
+
+class HostRateLimiter:
+    """Space out requests to the same host by a minimum interval"""
+
+    def __init__(self, min_interval: float = config.BATCH_HOST_INTERVAL):
+        self.min_interval = max(0.0, min_interval)
+        self._next_slot: Dict[str, float] = {}
+
+    async def wait(self, url: str):
+        """Sleep until the host of ``url`` may be requested again"""
+        if not self.min_interval:
+            return
+        host = urlsplit(url).netloc
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, now))
+        # Reserve the slot before sleeping so concurrent callers queue up behind it
+        self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class BatchJob:
+    """State and per-URL results of a single batch run"""
+
+    def __init__(
+        self,
+        urls: List[str],
+        concurrency: int,
+        load_options: Optional[LoadOptions] = None,
+        force: bool = False,
+    ):
+        self.id = uuid.uuid4().hex
+        self.urls = urls
+        self.concurrency = concurrency
+        self.load_options = load_options
+        self.force = force
+        self.status = "pending"
+        self.results: Dict[str, Dict] = {}
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def products(self) -> List[Dict]:
+        """Successfully scraped products in submission order"""
+        return [
+            self.results[url]["data"] for url in self.urls
+            if url in self.results and self.results[url]["status"] == "success"
+        ]
+
+    def to_dict(self, include_results: bool = True) -> Dict:
+        succeeded = sum(1 for r in self.results.values() if r["status"] == "success")
+        summary = {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.urls),
+            "processed": len(self.results),
+            "succeeded": succeeded,
+            "failed": len(self.results) - succeeded,
+            "concurrency": self.concurrency,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_results:
+            summary["results"] = [self.results[url] for url in self.urls if url in self.results]
+        return summary
+
+
+class BatchManager:
+    """Runs batch jobs in the background and keeps the most recent ones for polling"""
+
+    def __init__(
+        self,
+        results: Optional[ResultStore] = None,
+        max_jobs: int = config.BATCH_MAX_JOBS,
+        runs: Optional[RunStore] = None,
+    ):
+        self.results = results
+        self.runs = runs
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+        self._tasks = set()
+
+    def submit(
+        self,
+        urls: List[str],
+        service: ScrapeService,
+        concurrency: int = config.BATCH_CONCURRENCY,
+        host_interval: float = config.BATCH_HOST_INTERVAL,
+        load_options: Optional[LoadOptions] = None,
+        force: bool = False,
+    ) -> BatchJob:
+        """Create a job for ``urls`` and start it without waiting for the result"""
+        concurrency = min(max(1, concurrency), config.BATCH_MAX_CONCURRENCY)
+        job = BatchJob(urls, concurrency, load_options, force)
+        self._jobs[job.id] = job
+        self._evict()
+
+        task = asyncio.create_task(self._run(job, service, HostRateLimiter(host_interval)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        return self._jobs.get(job_id)
+
+    def _evict(self):
+        # Only finished jobs are dropped, running ones stay reachable
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].done:
+                del self._jobs[job_id]
+
+    async def _run(self, job: BatchJob, service: ScrapeService, limiter: HostRateLimiter):
+        logger.info(f"Starting batch {job.id} with {len(job.urls)} URLs (concurrency {job.concurrency})")
+        job.status = "running"
+        job.started_at = time.time()
+        semaphore = asyncio.Semaphore(job.concurrency)
+
+        async def worker(url: str):
+            async with semaphore:
+                await limiter.wait(url)
+                started = time.perf_counter()
+                try:
+                    data, report = await service.scrape(url, job.load_options, force=job.force)
+                    result = {"url": url, "status": "success", "data": data, **report}
+                except asyncio.TimeoutError:
+                    result = {"url": url, "status": "error", "error": "Scraping timeout"}
+                except ProductGoneError as e:
+                    result = {"url": url, "status": "error", "error": str(e), "gone": True}
+                except Exception as e:
+                    logger.error(f"Batch {job.id}: error scraping {url}: {str(e)}")
+                    result = {"url": url, "status": "error", "error": str(e)}
+                result["duration"] = round(time.perf_counter() - started, 3)
+                job.results[url] = result
+
+        try:
+            await asyncio.gather(*(worker(url) for url in job.urls))
+            if self.results:
+                await asyncio.to_thread(self._store_results, job)
+            if self.runs:
+                # Snapshot for change detection against the next batch run
+                failed = [url for url, result in job.results.items() if result["status"] != "success"]
+                gone = [url for url in failed if job.results[url].get("gone")]
+                await asyncio.to_thread(self.runs.record, job.id, job.products(), "batch", failed, gone)
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Batch {job.id} failed: {str(e)}")
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            logger.info(f"Batch {job.id} finished: {len(job.results)}/{len(job.urls)} processed")
+
+    def _store_results(self, job: BatchJob):
+        """Make the job's products downloadable by job id and by product id"""
+        products = job.products()
+        self.results.put(job.id, products)
+        for product in products:
+            self.results.put(product["artikelnummer"], [product])
+
+    async def shutdown(self):
+        """Cancel jobs that are still running"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,239 @@
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import time
+
+from . import config
+from .metrics import PHASE_SECONDS, timed
+from .resilience import TransientScrapeError
+
+logger = logging.getLogger(__name__)
+
+BROWSER_ARGS = [
+    '--disable-gpu',
+    '--disable-dev-shm-usage',
+    '--disable-setuid-sandbox',
+    '--no-sandbox',
+    '--no-zygote',
+]
+
+CONTEXT_OPTIONS = {
+    'viewport': {'width': 1280, 'height': 800},
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+}
+
+BROWSER_LAUNCH_TIMEOUT = 120000  # 120 second timeout for browser launch
+PAGE_DEFAULT_TIMEOUT = 60000  # 60 second timeout for all page operations
+
+
+def playwright_api():
+    """
+    The Playwright async API, imported on first use.
+
+    Importing Playwright is slow, and the web process must be able to serve
+    pages and downloads before (or without) a browser.
+    """
+    from playwright import async_api
+    return async_api
+
+
+async def launch_browser(playwright):
+    """Launch a headless Chromium with the scraper's default flags"""
+    with timed("browser_launch"):
+        return await playwright.chromium.launch(
+            headless=True,
+            args=BROWSER_ARGS,
+            timeout=BROWSER_LAUNCH_TIMEOUT,
+        )
+
+
+class _PooledContext:
+    """A browser context together with its usage counter"""
+
+    def __init__(self, context):
+        self.context = context
+        self.uses = 0
+
+
+class BrowserPool:
+    """
+    Process-wide Chromium instance that hands out isolated browser contexts.
+
+    The browser is launched once, at most ``size`` contexts are leased at the
+    same time, and a context is recycled after ``max_uses`` leases or as soon
+    as a lease ends with a Playwright error or a page load timeout.
+    """
+
+    def __init__(
+        self,
+        size: int = config.POOL_SIZE,
+        max_uses: int = config.POOL_CONTEXT_MAX_USES,
+        lease_timeout: float = config.POOL_LEASE_TIMEOUT,
+    ):
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.lease_timeout = lease_timeout
+        self._playwright = None
+        self._browser = None
+        self._idle: List[_PooledContext] = []
+        self._slots = asyncio.Semaphore(self.size)
+        self._launch_lock = asyncio.Lock()
+        self._active = 0
+        self._closing = False
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._stats = {
+            "leases": 0,
+            "lease_timeouts": 0,
+            "lease_wait_total": 0.0,
+            "lease_wait_max": 0.0,
+            "contexts_created": 0,
+            "recycled_max_uses": 0,
+            "recycled_crash": 0,
+            "browser_launches": 0,
+        }
+
+    @property
+    def started(self) -> bool:
+        return self._playwright is not None and not self._closing
+
+    async def start(self):
+        """Start Playwright and launch the shared browser"""
+        logger.info(f"Starting browser pool with {self.size} context slots...")
+        self._playwright = await playwright_api().async_playwright().start()
+        try:
+            await self._ensure_browser()
+        except Exception:
+            await self._playwright.stop()
+            self._playwright = None
+            raise
+        logger.info("Browser pool ready")
+
+    async def _ensure_browser(self):
+        async with self._launch_lock:
+            if self._browser and self._browser.is_connected():
+                return self._browser
+            if self._browser:
+                logger.warning("Shared browser disconnected, relaunching...")
+                self._idle.clear()
+            self._browser = await launch_browser(self._playwright)
+            self._stats["browser_launches"] += 1
+            return self._browser
+
+    async def _acquire_context(self) -> _PooledContext:
+        browser = await self._ensure_browser()
+        if self._idle:
+            return self._idle.pop()
+        with timed("context_create"):
+            context = await browser.new_context(**CONTEXT_OPTIONS)
+        self._stats["contexts_created"] += 1
+        return _PooledContext(context)
+
+    async def _release_context(self, pooled: _PooledContext, failed: bool):
+        pooled.uses += 1
+        if failed:
+            self._stats["recycled_crash"] += 1
+        elif pooled.uses >= self.max_uses:
+            self._stats["recycled_max_uses"] += 1
+        elif not self._closing and self._browser and self._browser.is_connected():
+            self._idle.append(pooled)
+            return
+        await self._close_context(pooled)
+
+    async def _close_context(self, pooled: _PooledContext):
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            logger.error(f"Error closing browser context: {str(e)}")
+
+    @asynccontextmanager
+    async def lease(self):
+        """Lease a fresh page in a pooled context for the duration of the block"""
+        if not self.started:
+            raise RuntimeError("Browser pool is not running")
+
+        wait_start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.lease_timeout)
+        except asyncio.TimeoutError:
+            self._stats["lease_timeouts"] += 1
+            raise RuntimeError("Kein Browser verfügbar. Bitte versuchen Sie es später erneut.")
+        waited = time.perf_counter() - wait_start
+        PHASE_SECONDS.observe(waited, phase="lease_wait")
+        self._stats["leases"] += 1
+        self._stats["lease_wait_total"] += waited
+        self._stats["lease_wait_max"] = max(self._stats["lease_wait_max"], waited)
+
+        self._active += 1
+        self._drained.clear()
+        pooled: Optional[_PooledContext] = None
+        failed = False
+        try:
+            pooled = await self._acquire_context()
+            page = await pooled.context.new_page()
+            page.set_default_timeout(PAGE_DEFAULT_TIMEOUT)
+            try:
+                yield page
+            finally:
+                try:
+                    await page.close()
+                except Exception:
+                    failed = True
+        except playwright_api().Error:
+            failed = True
+            raise
+        except TransientScrapeError as e:
+            # A page that timed out can leave the context hanging
+            failed = isinstance(e.__cause__, playwright_api().TimeoutError)
+            raise
+        finally:
+            if pooled:
+                await self._release_context(pooled, failed)
+            self._active -= 1
+            if self._active == 0:
+                self._drained.set()
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        """Return pool size, lease wait times and recycle counters"""
+        leases = self._stats["leases"]
+        return {
+            "size": self.size,
+            "active": self._active,
+            "idle": len(self._idle),
+            "browser_connected": bool(self._browser and self._browser.is_connected()),
+            "leases": leases,
+            "lease_timeouts": self._stats["lease_timeouts"],
+            "lease_wait_avg_ms": round(self._stats["lease_wait_total"] / leases * 1000, 2) if leases else 0.0,
+            "lease_wait_max_ms": round(self._stats["lease_wait_max"] * 1000, 2),
+            "contexts_created": self._stats["contexts_created"],
+            "recycled_max_uses": self._stats["recycled_max_uses"],
+            "recycled_crash": self._stats["recycled_crash"],
+            "browser_launches": self._stats["browser_launches"],
+        }
+
+    async def close(self, drain_timeout: float = config.POOL_DRAIN_TIMEOUT):
+        """Stop handing out leases, wait for running ones, then shut the browser down"""
+        if self._playwright is None:
+            return
+        self._closing = True
+        logger.info(f"Draining browser pool ({self._active} active leases)...")
+        try:
+            await asyncio.wait_for(self._drained.wait(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Browser pool drain timed out, closing with active leases")
+
+        for pooled in self._idle:
+            await self._close_context(pooled)
+        self._idle.clear()
+        try:
+            if self._browser:
+                await self._browser.close()
+            await self._playwright.stop()
+            logger.info("Browser pool closed successfully")
+        except Exception as e:
+            logger.error(f"Error closing browser pool: {str(e)}")
+        finally:
+            self._browser = None
+            self._playwright = None
@@ -0,0 +1,143 @@
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import json
+import logging
+import threading
+import time
+
+from . import config, db
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that never change the product page
+IGNORED_QUERY_PARAMS = frozenset({"gclid", "fbclid", "msclkid", "_ga", "ref"})
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a product URL so that equivalent URLs share one cache key"""
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not (key.lower().startswith("utm_") or key.lower() in IGNORED_QUERY_PARAMS)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+
+class CacheEntry:
+    """A cached product together with its HTTP validators"""
+
+    def __init__(self, url: str, data: Dict, etag: Optional[str], last_modified: Optional[str], fetched_at: float):
+        self.url = url
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = fetched_at
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+    @property
+    def revalidation_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ProductCache:
+    """
+    SQLite backed product cache keyed by normalized URL.
+
+    Entries are fresh for ``ttl`` seconds; afterwards they are stale and can
+    be revalidated with their ETag/Last-Modified. The least recently used
+    entries are evicted once more than ``max_entries`` are stored.
+    """
+
+    def __init__(
+        self,
+        path: str = config.CACHE_PATH,
+        ttl: float = config.CACHE_TTL,
+        max_entries: int = config.CACHE_MAX_ENTRIES,
+    ):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._db = db.connect(path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS products (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                data TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS products_accessed ON products (accessed_at)")
+        self._db.commit()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "revalidated": 0, "bypassed": 0, "evicted": 0}
+
+    def record(self, counter: str):
+        """Increase one of the hit/miss/stale/revalidated/bypassed counters"""
+        self._stats[counter] += 1
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Look up a URL and mark it as recently used"""
+        key = normalize_url(url)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, data, etag, last_modified, fetched_at FROM products WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE products SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        return CacheEntry(row[0], json.loads(row[1]), row[2], row[3], row[4])
+
+    def put(self, url: str, data: Dict, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Store a product and evict the least recently used entries beyond the size limit"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO products (key, url, data, etag, last_modified, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), url, json.dumps(data, ensure_ascii=False), etag, last_modified, now, now),
+            )
+            evicted = self._db.execute(
+                "DELETE FROM products WHERE key IN ("
+                "SELECT key FROM products ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            self._db.commit()
+        self._stats["evicted"] += max(0, evicted)
+
+    def touch(self, url: str):
+        """Mark an entry as fresh again after a successful revalidation"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE products SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, normalize_url(url)),
+            )
+            self._db.commit()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+        lookups = self._stats["hits"] + self._stats["misses"] + self._stats["stale"]
+        served = self._stats["hits"] + self._stats["revalidated"]
+        return {
+            **self._stats,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hit_ratio": round(served / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,100 @@
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import re
+
+from . import config
+
+try:
+    import yaml
+except ImportError:  # YAML mapping files are optional
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAPPING_PATH = Path(__file__).parent / "data" / "google_categories.json"
+
+
+class CategoryMapper:
+    """
+    Maps shop breadcrumbs to Google product categories.
+
+    All keywords of the mapping table are compiled into one regular
+    expression that reports a match at every position of the breadcrumb. A
+    keyword only matches at the end of a word, as a whole word or as the head
+    of a German compound ("Sommerkleid", but not "Kleidung" or
+    "Rockabilly"). Matches inside an excluded word ("Handtuch", "Desktop")
+    are ignored. The best match wins by rule priority, then by how far to the
+    right it ends (deeper breadcrumb levels), then by keyword length. Results
+    are memoized per breadcrumb.
+    """
+
+    def __init__(self, rules: List[Dict], default: str, cache_size: int = 16384,
+                 exclude: Tuple[str, ...] = ()):
+        self.default = default
+        self._keywords: Dict[str, Tuple[int, str]] = {}
+        for rule in rules:
+            category = rule["category"]
+            priority = int(rule.get("priority", 0))
+            for keyword in rule["keywords"]:
+                keyword = keyword.casefold().strip()
+                if not keyword:
+                    continue
+                previous = self._keywords.get(keyword)
+                if previous and previous[1] != category:
+                    logger.warning(f"Category keyword '{keyword}' is mapped twice, keeping '{previous[1]}'")
+                    continue
+                self._keywords[keyword] = (priority, category)
+        # Longest keywords first so the alternation prefers them at each position
+        alternatives = "|".join(re.escape(k) for k in sorted(self._keywords, key=len, reverse=True))
+        # A keyword must not be followed by another letter
+        self._pattern = re.compile(f"(?=({alternatives})(?![^\\W\\d_]))") if alternatives else None
+        excluded = sorted({w.casefold().strip() for w in exclude if w.strip()}, key=len, reverse=True)
+        self._exclude = re.compile("|".join(re.escape(w) for w in excluded)) if excluded else None
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "CategoryMapper":
+        """Load a JSON or YAML mapping table with ``default`` and ``rules``"""
+        path = Path(path or DEFAULT_MAPPING_PATH)
+        text = path.read_text(encoding="utf-8")
+        if path.suffix in (".yaml", ".yml"):
+            if yaml is None:
+                raise ValueError(f"Reading {path} requires PyYAML")
+            table = yaml.safe_load(text)
+        else:
+            table = json.loads(text)
+        try:
+            return cls(table["rules"], table["default"], exclude=tuple(table.get("exclude", ())))
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid category mapping in {path}: missing {str(e)}")
+
+    def _classify(self, breadcrumb: str) -> str:
+        if not breadcrumb or self._pattern is None:
+            return self.default
+        text = breadcrumb.casefold()
+        excluded = [m.span() for m in self._exclude.finditer(text)] if self._exclude else []
+        best = None
+        for match in self._pattern.finditer(text):
+            keyword = match.group(1)
+            end = match.start() + len(keyword)
+            if any(start <= match.start() and end <= stop for start, stop in excluded):
+                continue
+            priority, category = self._keywords[keyword]
+            rank = (priority, end, len(keyword))
+            if best is None or rank > best[0]:
+                best = (rank, category)
+        return best[1] if best else self.default
+
+
+@lru_cache(maxsize=1)
+def get_category_mapper() -> CategoryMapper:
+    """Mapping table from CATEGORY_MAP_PATH (or the bundled one), loaded once"""
+    mapper = CategoryMapper.from_file(config.CATEGORY_MAP_PATH)
+    logger.info(f"Loaded {len(mapper)} category keywords")
+    return mapper
@@ -0,0 +1,267 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from . import config, db
+from .cache import normalize_url
+
+logger = logging.getLogger(__name__)
+
+# Fields compared item by item, so a single size, image or variant is reported
+LIST_FIELDS = ("groessen", "bilder", "varianten")
+
+# Fields that depend on the request rather than the product, ignored when comparing
+REQUEST_FIELDS = ("url",)
+
+# Fields filtered by checks at scrape time, compared by the scraped value kept
+# next to them, so an image the CDN refused once is not a change
+SOURCE_FIELDS = {"bilder": "bilder_quelle"}
+
+
+def _comparable(product_data: Dict) -> Dict:
+    """Content of a product as compared between runs"""
+    content = {key: value for key, value in product_data.items() if key not in REQUEST_FIELDS}
+    for field, source in SOURCE_FIELDS.items():
+        if source in content:
+            content[field] = content.pop(source)
+    return content
+
+
+def product_fingerprint(product_data: Dict) -> str:
+    """Stable hash over the content of a product dict"""
+    content = _comparable(product_data)
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def url_key(product_data: Dict) -> str:
+    """Normalized URL a product was scraped from"""
+    return normalize_url(product_data.get("url") or "")
+
+
+def field_changes(old: Dict, new: Dict) -> Dict[str, Dict]:
+    """
+    Field-level differences between two versions of a product.
+
+    List fields report the added and removed items, all other fields their
+    old and new value.
+    """
+    old, new = _comparable(old), _comparable(new)
+    changes = {}
+    for key in sorted(set(old) | set(new)):
+        before, after = old.get(key), new.get(key)
+        if before == after:
+            continue
+        if key in LIST_FIELDS:
+            before, after = before or [], after or []
+            changes[key] = {
+                "added": [item for item in after if item not in before],
+                "removed": [item for item in before if item not in after],
+            }
+        else:
+            changes[key] = {"old": before, "new": after}
+    return changes
+
+
+def diff_runs(previous: Iterable[Dict], current: Iterable[Dict]) -> Dict:
+    """
+    Compare two scrape runs by article number.
+
+    Products with equal fingerprints are skipped without a field comparison.
+    """
+    old = {product["artikelnummer"]: product for product in previous}
+    new = {product["artikelnummer"]: product for product in current}
+    changed = {}
+    unchanged = 0
+    for number, product in new.items():
+        if number not in old:
+            continue
+        if product_fingerprint(product) == product_fingerprint(old[number]):
+            unchanged += 1
+        else:
+            changed[number] = field_changes(old[number], product)
+    return {
+        "added": [number for number in new if number not in old],
+        "removed": [number for number in old if number not in new],
+        "changed": changed,
+        "unchanged": unchanged,
+    }
+
+
+def delta_products(previous: Iterable[Dict], current: Iterable[Dict]) -> List[Dict]:
+    """New and changed products of ``current``, in their original order"""
+    fingerprints = {product["artikelnummer"]: product_fingerprint(product) for product in previous}
+    return [
+        product for product in current
+        if fingerprints.get(product["artikelnummer"]) != product_fingerprint(product)
+    ]
+
+
+def comparable_base(previous: Iterable[Dict], current: Iterable[Dict], requested: Set[str], gone: Set[str]) -> List[Dict]:
+    """
+    Products of the base run that a run covering the ``requested`` URLs can
+    be compared with.
+
+    Products from URLs the run did not request are left out. So is a product
+    missing from the run unless its page is ``gone`` (404/410), so only
+    confirmed removals are reported as removed.
+    """
+    numbers = {product["artikelnummer"] for product in current}
+    return [
+        product for product in previous
+        if url_key(product) in requested and (product["artikelnummer"] in numbers or url_key(product) in gone)
+    ]
+
+
+class RunStore:
+    """
+    Snapshots of scrape runs with a fingerprint per product, kept in SQLite
+    so later runs can be compared against them.
+
+    Each run also records the outcome of every requested URL. A URL that
+    failed keeps the product of the last run of the same kind that scraped
+    it, so a temporary error does not look like a removed product.
+    """
+
+    def __init__(self, path: str = config.RUN_STORE_PATH, history: int = config.RUN_HISTORY):
+        self.history = max(2, history)
+        self._lock = threading.Lock()
+        self._db = db.connect(path)
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS run_products (
+                run_id TEXT NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+                artikelnummer TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                product TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (run_id, artikelnummer)
+            )
+        """)
+        db.add_columns(self._db, "run_products", {"url_key": "TEXT"})
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS run_urls (
+                run_id TEXT NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+                url_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                PRIMARY KEY (run_id, url_key)
+            )
+        """)
+        self._db.commit()
+
+    def record(
+        self,
+        run_id: str,
+        products: List[Dict],
+        kind: str = "batch",
+        failed: Iterable[str] = (),
+        gone: Iterable[str] = (),
+    ):
+        """
+        Store the products of a finished run and drop runs beyond the history.
+
+        ``failed`` and ``gone`` are the URLs that could not be scraped and the
+        URLs that answered 404/410.
+        """
+        outcomes = {url_key(product): "success" for product in products}
+        outcomes.update({normalize_url(url): "failed" for url in failed})
+        outcomes.update({normalize_url(url): "gone" for url in gone})
+        with self._lock:
+            snapshot = list(products)
+            numbers = {product["artikelnummer"] for product in products}
+            for key, status in outcomes.items():
+                if status != "failed":
+                    continue
+                row = self._db.execute(
+                    "SELECT run_products.product FROM run_products JOIN runs ON runs.id = run_products.run_id "
+                    "WHERE runs.kind = ? AND run_products.url_key = ? ORDER BY runs.created_at DESC LIMIT 1",
+                    (kind, key),
+                ).fetchone()
+                carried = json.loads(row[0]) if row else None
+                if carried and carried["artikelnummer"] not in numbers:
+                    numbers.add(carried["artikelnummer"])
+                    snapshot.append(carried)
+            rows = [
+                (run_id, product["artikelnummer"], product_fingerprint(product),
+                 json.dumps(product, ensure_ascii=False), position, url_key(product))
+                for position, product in enumerate(snapshot)
+            ]
+            self._db.execute(
+                "INSERT OR REPLACE INTO runs (id, kind, created_at) VALUES (?, ?, ?)",
+                (run_id, kind, time.time()),
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO run_products "
+                "(run_id, artikelnummer, fingerprint, product, position, url_key) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO run_urls VALUES (?, ?, ?)",
+                [(run_id, key, status) for key, status in outcomes.items()],
+            )
+            self._db.execute(
+                "DELETE FROM runs WHERE kind = ? AND id NOT IN "
+                "(SELECT id FROM runs WHERE kind = ? ORDER BY created_at DESC LIMIT ?)",
+                (kind, kind, self.history),
+            )
+            self._db.commit()
+
+    def products(self, run_id: str) -> Optional[List[Dict]]:
+        with self._lock:
+            if not self._db.execute("SELECT 1 FROM runs WHERE id = ?", (run_id,)).fetchone():
+                return None
+            rows = self._db.execute(
+                "SELECT product FROM run_products WHERE run_id = ? ORDER BY position", (run_id,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def scope(self, run_id: str) -> Tuple[Set[str], Set[str]]:
+        """Normalized URLs the run requested, and those of them that were gone"""
+        with self._lock:
+            rows = self._db.execute("SELECT url_key, status FROM run_urls WHERE run_id = ?", (run_id,)).fetchall()
+            if not rows:
+                # Runs recorded without outcomes cover the URLs of their products
+                rows = [
+                    (url_key(json.loads(row[0])), "success") for row in self._db.execute(
+                        "SELECT product FROM run_products WHERE run_id = ?", (run_id,)
+                    )
+                ]
+        return {row[0] for row in rows}, {row[0] for row in rows if row[1] == "gone"}
+
+    def previous(self, run_id: str) -> Optional[str]:
+        """Id of the run of the same kind recorded before ``run_id``"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT prev.id FROM runs AS cur JOIN runs AS prev "
+                "ON prev.kind = cur.kind AND prev.created_at < cur.created_at "
+                "WHERE cur.id = ? ORDER BY prev.created_at DESC LIMIT 1",
+                (run_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def list(self, limit: int = 20) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT runs.id, runs.kind, runs.created_at, COUNT(run_products.artikelnummer) "
+                "FROM runs LEFT JOIN run_products ON run_products.run_id = runs.id "
+                "GROUP BY runs.id ORDER BY runs.created_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            {"run_id": row[0], "kind": row[1], "created_at": row[2], "products": row[3]}
+            for row in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
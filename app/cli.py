@@ -0,0 +1,367 @@
+"""
+Command-line bulk runner: scrape a URL list or a sitemap without the web server.
+
+    python -m app urls.txt --format csv --output produkte.csv
+    python -m app --sitemap https://www.blutsgeschwister.de/sitemap.xml -o produkte.jsonl --resume
+
+Results are streamed to the output as they arrive. Every finished URL is
+recorded in a checkpoint file, so a run that was interrupted continues with
+``--resume`` where it stopped instead of scraping everything again.
+"""
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import logging
+import queue
+import statistics
+import sys
+import threading
+import time
+import uuid
+
+from . import config, db
+from .batch import HostRateLimiter
+from .browser_pool import BrowserPool
+from .cache import ProductCache, normalize_url
+from .changes import RunStore
+from .crawler import CrawlState, Crawler
+from .http_fetcher import HTTPProductFetcher
+from .images import ImageCache, ImagePipeline
+from .resilience import ProductGoneError
+from .resource_blocking import LOAD_MODES, LoadOptions
+from .service import ScrapeService
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("jsonl", "xml", "csv", "feed")
+
+
+class Checkpoint:
+    """Outcome of every finished URL of a run, kept in SQLite"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._db = db.connect(path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                url TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                product TEXT,
+                error TEXT,
+                duration REAL,
+                finished_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def completed(self) -> List[Tuple[str, Dict]]:
+        """URLs scraped successfully, with their products, in the order they finished"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url, product FROM results WHERE status = 'success' ORDER BY finished_at"
+            ).fetchall()
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def record(self, url: str, product: Optional[Dict], error: Optional[str], duration: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (url, "success" if product is not None else "error",
+                 json.dumps(product, ensure_ascii=False) if product is not None else None,
+                 error, duration, time.time()),
+            )
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM results")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def read_url_file(path: str) -> List[str]:
+    """URLs from a file with one URL per line; blank lines and # comments are skipped"""
+    handle = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with handle:
+        return [line.strip() for line in handle if line.strip() and not line.strip().startswith("#")]
+
+
+def unique_urls(urls: Iterable[str]) -> List[str]:
+    """Drop URLs that normalize to one already seen, keeping the first spelling"""
+    seen = set()
+    result = []
+    for url in urls:
+        key = normalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            result.append(url)
+    return result
+
+
+def render(format: str, products: Iterable[Dict], prices: bool = False) -> Iterator[bytes]:
+    """Encode products with the exporter of ``format``; ``prices`` adds the CSV price columns"""
+    # Imported here, the exporters are only needed once there is output
+    from .exporters import CSVExporter, GoogleFeedExporter, XMLExporter
+
+    if format == "csv":
+        return CSVExporter.stream_csv(products, prices=prices)
+    if format == "xml":
+        return XMLExporter.stream_xml(products)
+    if format == "feed":
+        return GoogleFeedExporter.generate_feed(products)
+    return (json.dumps(product, ensure_ascii=False).encode("utf-8") + b"\n" for product in products)
+
+
+def _drain(products: "queue.Queue[Optional[Dict]]") -> Iterator[Dict]:
+    while True:
+        product = products.get()
+        if product is None:
+            return
+        yield product
+
+
+def write_output(format: str, products: "queue.Queue[Optional[Dict]]", out: BinaryIO, prices: bool = False):
+    """Write products from the queue until ``None`` arrives; runs in a thread"""
+    for chunk in render(format, _drain(products), prices):
+        out.write(chunk)
+        out.flush()
+
+
+class RunStats:
+    """Counters and per-URL latencies of a CLI run"""
+
+    def __init__(self, total: int, resumed: int):
+        self.total = total
+        self.resumed = resumed
+        self.succeeded = 0
+        self.failed: List[Tuple[str, str]] = []
+        self.gone: List[str] = []
+        self.sources: Dict[str, int] = {}
+        self.latencies: List[float] = []
+        self.started = time.perf_counter()
+
+    def summary(self) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        latencies = sorted(self.latencies)
+
+        def percentile(q: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3) if latencies else 0.0
+
+        scraped = self.succeeded + len(self.failed)
+        return {
+            "urls": self.total,
+            "resumed": self.resumed,
+            "succeeded": self.succeeded,
+            "failed": len(self.failed),
+            "sources": self.sources,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(scraped / elapsed, 3) if elapsed else 0.0,
+            "latency_s": {
+                "mean": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "max": round(latencies[-1], 3) if latencies else 0.0,
+            },
+        }
+
+
+def print_summary(summary: Dict, failed: List[Tuple[str, str]], stream=sys.stderr):
+    latency = summary["latency_s"]
+    sources = ", ".join(f"{name} {count}" for name, count in sorted(summary["sources"].items())) or "-"
+    lines = [
+        f"URLs:        {summary['urls']} ({summary['resumed']} from checkpoint)",
+        f"Succeeded:   {summary['succeeded']}",
+        f"Failed:      {summary['failed']}",
+        f"Sources:     {sources}",
+        f"Elapsed:     {summary['elapsed_s']:.1f} s",
+        f"Throughput:  {summary['throughput_per_s']:.2f} URLs/s",
+        f"Latency:     mean {latency['mean']:.2f} s, p50 {latency['p50']:.2f} s, "
+        f"p95 {latency['p95']:.2f} s, max {latency['max']:.2f} s",
+    ]
+    for url, error in failed[:10]:
+        lines.append(f"  failed: {url}: {error}")
+    if len(failed) > 10:
+        lines.append(f"  ... and {len(failed) - 10} more")
+    print("\n".join(lines), file=stream)
+
+
+async def discover(sitemap: str, url_pattern: str) -> List[str]:
+    """Product URLs of a sitemap (and its sub-sitemaps) that match ``url_pattern``"""
+    crawler = Crawler(None, CrawlState(":memory:"), url_pattern=url_pattern)
+    try:
+        return [url async for url, _ in crawler.discover_sitemap(sitemap)]
+    finally:
+        await crawler.close()
+
+
+async def _start_pool(pool: BrowserPool, service: ScrapeService):
+    try:
+        await pool.start()
+    except Exception as e:
+        # Scrapes that need a browser fall back to one per request
+        logger.error(f"Could not start browser pool: {str(e)}")
+        return
+    service.pool = pool
+
+
+async def run(args) -> int:
+    if args.sitemap:
+        urls = await discover(args.sitemap, args.url_pattern)
+    else:
+        urls = read_url_file(args.urls)
+    urls = unique_urls(urls)
+    if args.limit:
+        urls = urls[:args.limit]
+
+    checkpoint = Checkpoint(args.checkpoint) if args.checkpoint else None
+    if checkpoint and not args.resume:
+        checkpoint.clear()
+    done = checkpoint.completed() if checkpoint else []
+    done_urls = {url for url, _ in done}
+    pending = [url for url in urls if url not in done_urls]
+    stats = RunStats(len(urls), len(urls) - len(pending))
+    logger.info(f"Scraping {len(pending)} of {len(urls)} URLs with concurrency {args.concurrency}")
+
+    # Output is written in a thread fed through a queue, so it streams as results arrive
+    products: "queue.Queue[Optional[Dict]]" = queue.Queue()
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    writer = asyncio.create_task(asyncio.to_thread(write_output, args.format, products, out, args.prices))
+    # Products are only kept in memory for --record-run, the output streams
+    collected: List[Dict] = []
+    # Products from the checkpoint are written again, the output file is rebuilt on resume
+    for url, product in done:
+        if url in urls:
+            products.put(product)
+            if args.record_run:
+                collected.append(product)
+
+    fetcher = HTTPProductFetcher() if config.HTTP_FAST_PATH and not args.no_http else None
+    cache = ProductCache() if config.CACHE_ENABLED and not args.no_cache else None
+    images = ImagePipeline(cache=ImageCache()) if config.IMAGE_CHECK else None
+    service = ScrapeService(None, fetcher, cache, images=images)
+    pool = BrowserPool(size=args.concurrency)
+    # The browser starts while the HTTP fast path is already scraping
+    service.warmup = asyncio.create_task(_start_pool(pool, service))
+    load_options = LoadOptions(mode=args.mode)
+    limiter = HostRateLimiter(args.host_interval)
+    todo: "asyncio.Queue[str]" = asyncio.Queue()
+    for url in pending:
+        todo.put_nowait(url)
+
+    async def worker():
+        while True:
+            try:
+                url = todo.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await limiter.wait(url)
+            started = time.perf_counter()
+            product, error = None, None
+            try:
+                product, report = await service.scrape(url, load_options, force=args.force)
+                stats.sources[report["source"]] = stats.sources.get(report["source"], 0) + 1
+            except asyncio.TimeoutError:
+                error = "Scraping timeout"
+            except ProductGoneError as e:
+                error = str(e)
+                stats.gone.append(url)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            duration = time.perf_counter() - started
+            stats.latencies.append(duration)
+            if checkpoint:
+                await asyncio.to_thread(checkpoint.record, url, product, error, round(duration, 3))
+            if product is None:
+                logger.error(f"Failed to scrape {url}: {error}")
+                stats.failed.append((url, error))
+                continue
+            stats.succeeded += 1
+            products.put(product)
+            if args.record_run:
+                collected.append(product)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, args.concurrency))))
+    finally:
+        products.put(None)
+        await writer
+        if out is not sys.stdout.buffer:
+            out.close()
+        # Cancelling a browser launch halfway leaves the Playwright driver behind
+        await asyncio.gather(service.warmup, return_exceptions=True)
+        await pool.close()
+        if fetcher:
+            await fetcher.close()
+        if cache:
+            cache.close()
+        if images:
+            await images.close()
+        if checkpoint:
+            checkpoint.close()
+
+    summary = stats.summary()
+    if args.record_run:
+        runs = RunStore()
+        run_id = uuid.uuid4().hex
+        failed = [url for url, _ in stats.failed]
+        await asyncio.to_thread(runs.record, run_id, collected, "cli", failed, stats.gone)
+        runs.close()
+        summary["run_id"] = run_id
+    print_summary(summary, stats.failed)
+    if args.summary_json:
+        Path(args.summary_json).write_text(json.dumps(summary, indent=2) + "\n", encoding="utf-8")
+    return 1 if stats.failed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("urls", nargs="?", help="file with one product URL per line, - for stdin")
+    source.add_argument("--sitemap", help="sitemap (or sitemap index) URL to read product URLs from")
+    parser.add_argument("--url-pattern", default=config.CRAWL_URL_PATTERN,
+                        help="regular expression sitemap URLs must match")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="jsonl", help="output format")
+    parser.add_argument("--prices", action="store_true", help="add fVKBrutto and fSonderpreisBrutto to the CSV")
+    parser.add_argument("-o", "--output", help="output file, standard output by default")
+    parser.add_argument("-c", "--concurrency", type=int, default=config.BATCH_CONCURRENCY,
+                        help="URLs scraped in parallel")
+    parser.add_argument("--host-interval", type=float, default=config.BATCH_HOST_INTERVAL,
+                        help="minimum seconds between two requests to the same host")
+    parser.add_argument("--mode", choices=LOAD_MODES, default=config.SCRAPE_LOAD_MODE, help="page load mode")
+    parser.add_argument("--checkpoint", help="checkpoint file, defaults to <output>.checkpoint.sqlite3")
+    parser.add_argument("--resume", action="store_true", help="skip URLs the checkpoint marks as done")
+    parser.add_argument("--force", action="store_true", help="bypass the product cache lookup")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the product cache")
+    parser.add_argument("--no-http", action="store_true", help="always scrape with the browser")
+    parser.add_argument("--limit", type=int, help="scrape at most this many URLs")
+    parser.add_argument("--record-run", action="store_true",
+                        help="store the products as a run for change detection")
+    parser.add_argument("--summary-json", help="also write the summary as JSON to this file")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only log warnings and errors")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.checkpoint is None and args.output:
+        args.checkpoint = f"{args.output}.checkpoint.sqlite3"
+    if args.resume and not args.checkpoint:
+        parser.error("--resume needs --output or --checkpoint")
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger().setLevel(logging.WARNING if args.quiet else logging.INFO)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    try:
+        return asyncio.run(run(args))
+    except KeyboardInterrupt:
+        print("Interrupted, continue with --resume", file=sys.stderr)
+        return 130
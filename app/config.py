@@ -0,0 +1,115 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _int_env(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _float_env(name: str, default: float) -> float:
+    """Read a float setting from the environment"""
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Browser pool
+POOL_SIZE = _int_env("SCRAPER_POOL_SIZE", 2)
+POOL_CONTEXT_MAX_USES = _int_env("SCRAPER_CONTEXT_MAX_USES", 20)
+POOL_LEASE_TIMEOUT = _int_env("SCRAPER_LEASE_TIMEOUT", 60)
+POOL_DRAIN_TIMEOUT = _int_env("SCRAPER_DRAIN_TIMEOUT", 30)
+
+# Startup: "fast" serves requests while the browser warms up in the background,
+# "eager" waits for the browser pool before accepting requests
+STARTUP_MODE = os.getenv("STARTUP_MODE", "fast")
+
+# Page loading: "fast" blocks images, fonts and trackers, "full" waits for network idle
+SCRAPE_LOAD_MODE = os.getenv("SCRAPE_LOAD_MODE", "fast")
+
+# Browserless HTTP fast path
+HTTP_FAST_PATH = os.getenv("SCRAPE_HTTP_FAST_PATH", "1") == "1"
+HTTP_VERIFY = os.getenv("SCRAPE_HTTP_VERIFY", "0") == "1"
+HTTP_TIMEOUT = _float_env("SCRAPE_HTTP_TIMEOUT", 20.0)
+HTTP_MAX_CONNECTIONS = _int_env("SCRAPE_HTTP_MAX_CONNECTIONS", 10)
+
+# Product cache
+CACHE_ENABLED = os.getenv("SCRAPE_CACHE_ENABLED", "1") == "1"
+CACHE_PATH = os.getenv("SCRAPE_CACHE_PATH", "data/cache.sqlite3")
+CACHE_TTL = _float_env("SCRAPE_CACHE_TTL", 3600.0)
+CACHE_MAX_ENTRIES = _int_env("SCRAPE_CACHE_MAX_ENTRIES", 5000)
+
+# Result store: "memory" (per worker) or "sqlite" (shared by all workers)
+RESULT_STORE_BACKEND = os.getenv("RESULT_STORE_BACKEND", "memory")
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", "data/results.sqlite3")
+RESULT_TTL = _float_env("RESULT_TTL", 86400.0)
+RESULT_MAX_ENTRIES = _int_env("RESULT_MAX_ENTRIES", 1000)
+
+# Gallery images: keep the widest rendition per asset and drop broken images
+IMAGE_CHECK = os.getenv("IMAGE_CHECK", "1") == "1"
+IMAGE_CACHE_PATH = os.getenv("IMAGE_CACHE_PATH", "data/images.sqlite3")
+IMAGE_CACHE_TTL = _float_env("IMAGE_CACHE_TTL", 604800.0)
+IMAGE_CONCURRENCY = _int_env("IMAGE_CONCURRENCY", 8)
+IMAGE_PROBE_BYTES = _int_env("IMAGE_PROBE_BYTES", 65536)
+IMAGE_TIMEOUT = _float_env("IMAGE_TIMEOUT", 10.0)
+
+# Google category mapping table (JSON or YAML); empty uses app/data/google_categories.json
+CATEGORY_MAP_PATH = os.getenv("CATEGORY_MAP_PATH", "")
+
+# Snapshots of batch runs for change detection and delta exports
+RUN_STORE_PATH = os.getenv("RUN_STORE_PATH", "data/runs.sqlite3")
+RUN_HISTORY = _int_env("RUN_HISTORY", 20)
+
+# Crawler
+CRAWL_SITEMAP_URL = os.getenv("CRAWL_SITEMAP_URL", "https://www.blutsgeschwister.de/sitemap.xml")
+CRAWL_URL_PATTERN = os.getenv("CRAWL_URL_PATTERN", r"^https://www\.blutsgeschwister\.de/de/.+")
+# Skip sitemap entries without <image:image> when the sitemap lists images (categories, CMS pages)
+CRAWL_SITEMAP_PRODUCTS_ONLY = os.getenv("CRAWL_SITEMAP_PRODUCTS_ONLY", "1") == "1"
+CRAWL_STATE_PATH = os.getenv("CRAWL_STATE_PATH", "data/crawl.sqlite3")
+CRAWL_CONCURRENCY = _int_env("CRAWL_CONCURRENCY", 2)
+# Failing URLs wait CRAWL_RETRY_BACKOFF seconds, doubled per failure, and are given up after CRAWL_MAX_FAILURES
+CRAWL_MAX_FAILURES = _int_env("CRAWL_MAX_FAILURES", 5)
+CRAWL_RETRY_BACKOFF = _float_env("CRAWL_RETRY_BACKOFF", 3600.0)
+
+# Retries of transient failures (timeouts, 429/5xx) with jittered exponential backoff
+RETRY_ATTEMPTS = _int_env("SCRAPE_RETRY_ATTEMPTS", 3)
+RETRY_BASE_DELAY = _float_env("SCRAPE_RETRY_BASE_DELAY", 0.5)
+RETRY_MAX_DELAY = _float_env("SCRAPE_RETRY_MAX_DELAY", 10.0)
+
+# Per-host adaptive concurrency and circuit breaker
+HOST_CONCURRENCY_INITIAL = _int_env("HOST_CONCURRENCY_INITIAL", 2)
+HOST_CONCURRENCY_MAX = _int_env("HOST_CONCURRENCY_MAX", 8)
+HOST_LATENCY_TARGET = _float_env("HOST_LATENCY_TARGET", 15.0)
+BREAKER_FAILURE_THRESHOLD = _int_env("BREAKER_FAILURE_THRESHOLD", 5)
+BREAKER_RESET_TIMEOUT = _float_env("BREAKER_RESET_TIMEOUT", 30.0)
+
+# Background scrape jobs; 0 workers scrapes inside the web process, where the
+# metrics, cache, host and pool stats endpoints see every scrape
+JOB_WORKERS = _int_env("JOB_WORKERS", 0)
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "data/jobs.sqlite3")
+JOB_MAX_QUEUE_DEPTH = _int_env("JOB_MAX_QUEUE_DEPTH", 100)
+JOB_MAX_RETRIES = _int_env("JOB_MAX_RETRIES", 1)
+JOB_POLL_INTERVAL = _float_env("JOB_POLL_INTERVAL", 0.5)
+JOB_SUPERVISE_INTERVAL = _float_env("JOB_SUPERVISE_INTERVAL", 5.0)
+# Seconds a running job stays claimed without a heartbeat from its worker
+JOB_LEASE_TIMEOUT = _float_env("JOB_LEASE_TIMEOUT", 60.0)
+
+# Record OpenTelemetry spans for every pipeline phase (needs opentelemetry-api)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "0") == "1"
+
+# Overall budget for a single scrape request
+SCRAPE_TIMEOUT = _int_env("SCRAPE_TIMEOUT", 120)
+
+# Batch scraping
+BATCH_CONCURRENCY = _int_env("BATCH_CONCURRENCY", 2)
+BATCH_MAX_CONCURRENCY = _int_env("BATCH_MAX_CONCURRENCY", 8)
+BATCH_HOST_INTERVAL = _float_env("BATCH_HOST_INTERVAL", 1.0)
+BATCH_MAX_URLS = _int_env("BATCH_MAX_URLS", 1000)
+BATCH_MAX_JOBS = _int_env("BATCH_MAX_JOBS", 50)
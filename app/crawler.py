@@ -0,0 +1,380 @@
+from collections import OrderedDict
+from selectolax.parser import HTMLParser
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from urllib.parse import urljoin, urldefrag
+import asyncio
+import gzip
+import logging
+import re
+import threading
+import time
+import uuid
+import xml.etree.ElementTree as ET
+
+import httpx
+
+from . import config, db
+from .cache import normalize_url
+from .changes import product_fingerprint
+from .http_fetcher import REQUEST_HEADERS
+from .resilience import ProductGoneError
+from .results import ResultStore
+from .service import ScrapeService
+
+logger = logging.getLogger(__name__)
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+IMAGE_NS = "{http://www.google.com/schemas/sitemap-image/1.1}"
+MAX_SITEMAP_DEPTH = 3
+MAX_LISTING_PAGES = 50
+
+# Queue priorities, lower runs first
+PRIORITY_NEW = 0
+PRIORITY_CHANGED = 1
+PRIORITY_RECHECK = 2
+
+
+class CrawlEntry:
+    """What the last crawl learned about a product URL"""
+
+    def __init__(
+        self,
+        lastmod: Optional[str],
+        content_hash: Optional[str],
+        scraped_at: Optional[float],
+        failures: int = 0,
+        gone: bool = False,
+        failed_at: Optional[float] = None,
+    ):
+        self.lastmod = lastmod
+        self.content_hash = content_hash
+        self.scraped_at = scraped_at
+        self.failures = failures
+        self.gone = gone
+        self.failed_at = failed_at
+
+    def retry_due(self, now: float) -> bool:
+        """Whether a failing URL may be scraped again; the wait doubles with every failure"""
+        if self.gone or self.failures >= config.CRAWL_MAX_FAILURES:
+            return False
+        backoff = config.CRAWL_RETRY_BACKOFF * 2 ** max(0, self.failures - 1)
+        return self.failed_at is None or now - self.failed_at >= backoff
+
+
+class CrawlState:
+    """Persistent seen-set with lastmod, content hash and failures per product URL"""
+
+    def __init__(self, path: str = config.CRAWL_STATE_PATH):
+        self._lock = threading.Lock()
+        self._db = db.connect(path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_state (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                lastmod TEXT,
+                content_hash TEXT,
+                scraped_at REAL,
+                error TEXT
+            )
+        """)
+        db.add_columns(self._db, "crawl_state", {
+            "failures": "INTEGER NOT NULL DEFAULT 0",
+            "gone": "INTEGER NOT NULL DEFAULT 0",
+            "failed_at": "REAL",
+        })
+        self._db.commit()
+
+    def get_many(self, urls: List[str]) -> Dict[str, CrawlEntry]:
+        """Return the stored entry of every known URL"""
+        known = {}
+        with self._lock:
+            for url in urls:
+                row = self._db.execute(
+                    "SELECT lastmod, content_hash, scraped_at, failures, gone, failed_at "
+                    "FROM crawl_state WHERE key = ?",
+                    (normalize_url(url),),
+                ).fetchone()
+                if row:
+                    known[url] = CrawlEntry(row[0], row[1], row[2], row[3], bool(row[4]), row[5])
+        return known
+
+    def record(self, url: str, lastmod: Optional[str], content_hash: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO crawl_state (key, url, lastmod, content_hash, scraped_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET lastmod = excluded.lastmod, content_hash = excluded.content_hash, "
+                "scraped_at = excluded.scraped_at, error = NULL, failures = 0, gone = 0, failed_at = NULL",
+                (normalize_url(url), url, lastmod, content_hash, time.time()),
+            )
+            self._db.commit()
+
+    def record_failure(self, url: str, lastmod: Optional[str], error: str, gone: bool = False):
+        """
+        Count a failed scrape. The previous hash is kept, so a later success
+        is compared against the last good content.
+        """
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO crawl_state (key, url, lastmod, error, failures, gone, failed_at) "
+                "VALUES (?, ?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET lastmod = excluded.lastmod, error = excluded.error, "
+                "failures = failures + 1, gone = excluded.gone, failed_at = excluded.failed_at",
+                (normalize_url(url), url, lastmod, error, int(gone), time.time()),
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class CrawlJob:
+    """Progress and outcome of a single crawl"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "pending"
+        self.discovered = 0
+        self.queued = 0
+        self.skipped = 0
+        self.skipped_failing = 0
+        self.changed: List[str] = []
+        self.unchanged = 0
+        self.failed: Dict[str, str] = {}
+        self.gone: List[str] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "discovered": self.discovered,
+            "queued": self.queued,
+            "skipped_unchanged_lastmod": self.skipped,
+            "skipped_failing": self.skipped_failing,
+            "scraped": len(self.changed) + self.unchanged + len(self.failed) + len(self.gone),
+            "changed": len(self.changed),
+            "unchanged": self.unchanged,
+            "failed": len(self.failed),
+            "gone": len(self.gone),
+            "errors": self.failed,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class Crawler:
+    """
+    Discovers product URLs from the sitemap or category listings and scrapes
+    only products that are new or changed since the last crawl.
+
+    A URL whose sitemap ``lastmod`` is unchanged is skipped; otherwise it is
+    scraped and its content hash compared with the stored one. Failing URLs
+    are retried with a growing backoff and given up after
+    ``CRAWL_MAX_FAILURES``; pages that answered 404/410 are skipped until
+    their ``lastmod`` changes.
+    """
+
+    def __init__(
+        self,
+        service: ScrapeService,
+        state: CrawlState,
+        results: Optional[ResultStore] = None,
+        url_pattern: str = config.CRAWL_URL_PATTERN,
+        products_only: bool = config.CRAWL_SITEMAP_PRODUCTS_ONLY,
+    ):
+        self.service = service
+        self.state = state
+        self.results = results
+        self.url_pattern = re.compile(url_pattern)
+        self.products_only = products_only
+        self.client = httpx.AsyncClient(headers=REQUEST_HEADERS, follow_redirects=True, timeout=config.HTTP_TIMEOUT)
+        self._jobs: "OrderedDict[str, CrawlJob]" = OrderedDict()
+        self._tasks = set()
+
+    def start(self, **options) -> CrawlJob:
+        """Run a crawl in the background; ``options`` are passed to :meth:`run`"""
+        job = CrawlJob()
+        self._jobs[job.id] = job
+        self._evict()
+        task = asyncio.create_task(self.run(job, **options))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[CrawlJob]:
+        return self._jobs.get(job_id)
+
+    def _evict(self):
+        # Only finished crawls are dropped, running ones stay reachable
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= config.BATCH_MAX_JOBS:
+                break
+            if self._jobs[job_id].done:
+                del self._jobs[job_id]
+
+    async def close(self):
+        """Cancel running crawls and release the HTTP client and state"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.client.aclose()
+        self.state.close()
+
+    def _is_product(self, url: str) -> bool:
+        return bool(self.url_pattern.match(url))
+
+    async def _get(self, url: str) -> bytes:
+        response = await self.client.get(url)
+        response.raise_for_status()
+        content = response.content
+        if content[:2] == b"\x1f\x8b":
+            content = gzip.decompress(content)
+        return content
+
+    async def discover_sitemap(self, sitemap_url: str, depth: int = 0) -> AsyncIterator[Tuple[str, Optional[str]]]:
+        """Yield ``(url, lastmod)`` for product URLs, following sitemap indexes"""
+        root = ET.fromstring(await self._get(sitemap_url))
+        if root.tag == f"{SITEMAP_NS}sitemapindex":
+            if depth >= MAX_SITEMAP_DEPTH:
+                return
+            for loc in root.iter(f"{SITEMAP_NS}loc"):
+                async for entry in self.discover_sitemap(loc.text.strip(), depth + 1):
+                    yield entry
+            return
+        nodes = list(root.iter(f"{SITEMAP_NS}url"))
+        # Shop sitemaps list images only for products; categories and CMS pages have none
+        with_images = self.products_only and any(node.find(f"{IMAGE_NS}image") is not None for node in nodes)
+        for node in nodes:
+            if with_images and node.find(f"{IMAGE_NS}image") is None:
+                continue
+            loc = node.findtext(f"{SITEMAP_NS}loc", "").strip()
+            if loc and self._is_product(loc):
+                yield loc, (node.findtext(f"{SITEMAP_NS}lastmod") or "").strip() or None
+
+    async def discover_listing(self, category_url: str) -> AsyncIterator[Tuple[str, Optional[str]]]:
+        """Yield product URLs linked from a category listing and its next pages"""
+        page_url: Optional[str] = category_url
+        for _ in range(MAX_LISTING_PAGES):
+            if not page_url:
+                break
+            tree = HTMLParser((await self._get(page_url)).decode("utf-8", errors="replace"))
+            for link in tree.css("a[href]"):
+                url = urldefrag(urljoin(page_url, link.attributes.get("href") or ""))[0]
+                if self._is_product(url):
+                    yield url, None
+            next_link = tree.css_first('a[rel="next"], link[rel="next"]')
+            page_url = urljoin(page_url, next_link.attributes.get("href") or "") if next_link else None
+
+    async def _discover(self, sitemap_url: Optional[str], category_urls: List[str]) -> Dict[str, Optional[str]]:
+        found: Dict[str, Optional[str]] = {}
+        seen: Set[str] = set()
+
+        def add(url: str, lastmod: Optional[str]):
+            key = normalize_url(url)
+            if key not in seen:
+                seen.add(key)
+                found[url] = lastmod
+
+        if sitemap_url:
+            async for url, lastmod in self.discover_sitemap(sitemap_url):
+                add(url, lastmod)
+        for category_url in category_urls:
+            async for url, lastmod in self.discover_listing(category_url):
+                add(url, lastmod)
+        return found
+
+    async def run(
+        self,
+        job: CrawlJob,
+        sitemap_url: Optional[str] = config.CRAWL_SITEMAP_URL,
+        category_urls: Optional[List[str]] = None,
+        concurrency: int = config.CRAWL_CONCURRENCY,
+        force: bool = False,
+    ):
+        """Discover, prioritize and scrape; changed products end up in the result store"""
+        job.status = "discovering"
+        job.started_at = time.time()
+        try:
+            found = await self._discover(sitemap_url, category_urls or [])
+            job.discovered = len(found)
+            known = await asyncio.to_thread(self.state.get_many, list(found))
+
+            queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+            now = time.time()
+            for order, (url, lastmod) in enumerate(found.items()):
+                previous = known.get(url)
+                lastmod_changed = bool(lastmod) and previous is not None and lastmod != previous.lastmod
+                if previous is None:
+                    priority = PRIORITY_NEW
+                elif force or lastmod_changed:
+                    priority = PRIORITY_CHANGED if lastmod else PRIORITY_RECHECK
+                elif previous.failures or previous.gone:
+                    if not previous.retry_due(now):
+                        job.skipped_failing += 1
+                        continue
+                    priority = PRIORITY_RECHECK
+                elif not lastmod or previous.content_hash is None:
+                    priority = PRIORITY_RECHECK
+                else:
+                    job.skipped += 1
+                    continue
+                queue.put_nowait((priority, order, url, lastmod, previous.content_hash if previous else None))
+            job.queued = queue.qsize()
+            logger.info(f"Crawl {job.id}: {job.discovered} products found, {job.queued} to scrape")
+
+            job.status = "scraping"
+            changed_products: List[Dict] = []
+            workers = [
+                asyncio.create_task(self._worker(job, queue, changed_products, force))
+                for _ in range(max(1, concurrency))
+            ]
+            await queue.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+            if self.results and changed_products:
+                await asyncio.to_thread(self.results.put, job.id, changed_products)
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Crawl {job.id} failed: {str(e)}")
+            job.status = "failed"
+            job.failed["_crawl"] = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    async def _worker(self, job: CrawlJob, queue: asyncio.PriorityQueue, changed: List[Dict], force: bool):
+        while True:
+            _, _, url, lastmod, previous_hash = await queue.get()
+            try:
+                # Stale cache entries are revalidated with their ETag/Last-Modified
+                product_data, _ = await self.service.scrape(url, force=force)
+                content_hash = product_fingerprint(product_data)
+                await asyncio.to_thread(self.state.record, url, lastmod, content_hash)
+                if content_hash == previous_hash:
+                    job.unchanged += 1
+                else:
+                    job.changed.append(url)
+                    changed.append(product_data)
+                    if self.results:
+                        await asyncio.to_thread(self.results.put, product_data["artikelnummer"], [product_data])
+            except ProductGoneError as e:
+                logger.info(f"Crawl {job.id}: {url} is gone")
+                job.gone.append(url)
+                await asyncio.to_thread(self.state.record_failure, url, lastmod, str(e), True)
+            except Exception as e:
+                logger.error(f"Crawl {job.id}: error scraping {url}: {str(e)}")
+                job.failed[url] = str(e) or type(e).__name__
+                await asyncio.to_thread(self.state.record_failure, url, lastmod, job.failed[url])
+            finally:
+                queue.task_done()
@@ -0,0 +1,25 @@
+from pathlib import Path
+from typing import Dict
+import sqlite3
+
+
+def connect(path: str, timeout: float = 30) -> sqlite3.Connection:
+    """
+    Open a SQLite database shared between threads, in WAL mode.
+
+    The parent directory is created unless ``path`` is ``":memory:"``.
+    Callers serialize access with their own lock.
+    """
+    if path != ":memory:":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False, timeout=timeout)
+    db.execute("PRAGMA journal_mode=WAL")
+    return db
+
+
+def add_columns(db: sqlite3.Connection, table: str, columns: Dict[str, str]):
+    """Add ``columns`` (name to SQL type) missing from a table created by an older version"""
+    existing = {row[1] for row in db.execute(f"PRAGMA table_info({table})")}
+    for name, definition in columns.items():
+        if name not in existing:
+            db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
@@ -1,4 +1,22 @@
-from .xml_exporter import XMLExporter
-from .csv_exporter import CSVExporter
+from importlib import import_module
 
-__all__ = ['XMLExporter', 'CSVExporter']
+# Exporters are imported on first use, the web process does not need them to start
+_EXPORTER_MODULES = {
+    'XMLExporter': '.xml_exporter',
+    'CSVExporter': '.csv_exporter',
+    'GoogleFeedExporter': '.feed_exporter',
+}
+
+__all__ = ['XMLExporter', 'CSVExporter', 'GoogleFeedExporter']
+
+
+def __getattr__(name):
+    if name in _EXPORTER_MODULES:
+        exporter = getattr(import_module(_EXPORTER_MODULES[name], __name__), name)
+        globals()[name] = exporter
+        return exporter
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(__all__)
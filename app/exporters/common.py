@@ -0,0 +1,8 @@
+from typing import List
+
+GOOGLE_NAMESPACE = "http://base.google.com/ns/1.0"
+
+
+def cdata_sections(text: str) -> List[str]:
+    """Split ``text`` into CDATA section contents; "]]>" cannot appear inside one section"""
+    return text.replace("]]>", "]]]]><![CDATA[>").split("]]><![CDATA[")
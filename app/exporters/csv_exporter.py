@@ -1,38 +1,61 @@
-from typing import Dict
+from typing import Dict, Iterable, Iterator, List, Optional
 import csv
 import io
+import zlib
+
+from ..changes import product_fingerprint
+from ..sanitizer import html_to_text
+from ..variants import Variant, variants_of
 
 class CSVExporter:
+    HEADER = [
+        'VaterartikelNr',
+        'cHAN',
+        'fLagerbestandeigen',
+        'cbarcode',
+        'cArtNr',
+        'cName',
+        'cBeschreibung',
+        'cFirma',
+        'cHerstellerName',
+        'Attributgruppe',
+        'Attributname',
+        'Attributwert',
+        'Shopaktiv',
+        'Shop',
+        'IstVaterArtikel',
+        'kVaterartikel'
+    ]
+    # Appended with ``prices``, the default header stays the one JTL-Wawi imports expect
+    PRICE_HEADER = ['fVKBrutto', 'fSonderpreisBrutto']
+
     @staticmethod
-    def generate_csv(product_data: Dict) -> str:
-        """
-        Generate CSV from product data
-        """
-        output = io.StringIO()
-        writer = csv.writer(output, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-        
-        # Write header
-        header = [
-            'VaterartikelNr',
-            'cHAN',
-            'fLagerbestandeigen',
-            'cbarcode',
-            'cArtNr',
-            'cName',
-            'cBeschreibung',
-            'cFirma',
-            'cHerstellerName',
-            'Attributgruppe',
-            'Attributname',
-            'Attributwert',
-            'Shopaktiv',
-            'Shop',
-            'IstVaterArtikel',
-            'kVaterartikel'
-        ]
-        writer.writerow(header)
-        
-        # Write product data
+    def _price(value: Optional[float]) -> str:
+        """Price with a decimal comma, empty when unknown"""
+        return f"{value:.2f}".replace('.', ',') if value is not None else ''
+
+    @staticmethod
+    def _stock(variant: Variant) -> str:
+        if variant.stock is not None:
+            return str(max(0, variant.stock))
+        return '1' if variant.available else '0'
+
+    @staticmethod
+    def _header(prices: bool = False) -> List[str]:
+        return CSVExporter.HEADER + CSVExporter.PRICE_HEADER if prices else CSVExporter.HEADER
+
+    @staticmethod
+    def _writer(output: io.StringIO):
+        return csv.writer(output, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
+
+    @staticmethod
+    def _father_row(
+        product_data: Dict,
+        active: bool = True,
+        plain_text: bool = False,
+        prices: bool = False,
+    ) -> List[str]:
+        details = product_data.get('details', '')
         row = [
             product_data.get('artikelnummer', ''),  # VaterartikelNr
             '',  # cHAN
@@ -40,21 +63,156 @@ class CSVExporter:
             '',  # cbarcode
             product_data.get('artikelnummer', ''),  # cArtNr
             product_data.get('name', ''),  # cName
-            product_data.get('details', ''),  # cBeschreibung
+            html_to_text(details) if plain_text else details,  # cBeschreibung
             'Blutsgeschwister',  # cFirma
             'Blutsgeschwister',  # cHerstellerName
             'Größe',  # Attributgruppe
             'Größe',  # Attributname
             ', '.join(product_data.get('groessen', [])),  # Attributwert
-            '1',  # Shopaktiv
+            '1' if active else '0',  # Shopaktiv
             'Blutsgeschwister',  # Shop
             '1',  # IstVaterArtikel
             ''  # kVaterartikel
         ]
-        writer.writerow(row)
-        
+        if prices:
+            amounts = [variant.price for variant in variants_of(product_data) if variant.price is not None]
+            row.append(CSVExporter._price(min(amounts) if amounts else None))  # fVKBrutto (lowest variant price)
+            row.append('')  # fSonderpreisBrutto
+        return row
+
+    @staticmethod
+    def _child_rows(
+        product_data: Dict,
+        variants: Optional[List[Variant]] = None,
+        active: bool = True,
+        prices: bool = False,
+    ) -> Iterator[List[str]]:
+        """One row per variant with its SKU, EAN and stock, and with ``prices`` its price"""
+        father = product_data.get('artikelnummer', '')
+        for variant in variants_of(product_data) if variants is None else variants:
+            size = variant.size
+            row = [
+                father,  # VaterartikelNr
+                variant.sku,  # cHAN
+                CSVExporter._stock(variant) if active else '0',  # fLagerbestandeigen
+                variant.ean,  # cbarcode
+                f"{father}-{size}",  # cArtNr
+                f"{product_data.get('name', '')} {size}".strip(),  # cName
+                '',  # cBeschreibung (inherited from the father article)
+                'Blutsgeschwister',  # cFirma
+                'Blutsgeschwister',  # cHerstellerName
+                'Größe',  # Attributgruppe
+                'Größe',  # Attributname
+                size,  # Attributwert
+                '1' if active else '0',  # Shopaktiv
+                'Blutsgeschwister',  # Shop
+                '0',  # IstVaterArtikel
+                father  # kVaterartikel
+            ]
+            if prices:
+                row.append(CSVExporter._price(variant.price))  # fVKBrutto
+                row.append(CSVExporter._price(variant.sale_price))  # fSonderpreisBrutto
+            yield row
+
+    @staticmethod
+    def generate_csv(product_data: Dict, prices: bool = False) -> str:
+        """
+        Generate CSV from product data
+        """
+        output = io.StringIO()
+        writer = CSVExporter._writer(output)
+
+        # Write header
+        writer.writerow(CSVExporter._header(prices))
+
+        # Write product data
+        writer.writerow(CSVExporter._father_row(product_data, prices=prices))
+
         # Get the CSV content
         csv_content = output.getvalue()
         output.close()
-        
+
         return csv_content
+
+    @staticmethod
+    def _delta_rows(
+        previous: Iterable[Dict],
+        current: Iterable[Dict],
+        plain_text: bool = False,
+        prices: bool = False,
+    ) -> Iterator[List[List[str]]]:
+        """Rows per product that differs from the previous run"""
+        old = {product['artikelnummer']: product for product in previous}
+        seen = set()
+        for product_data in current:
+            number = product_data['artikelnummer']
+            seen.add(number)
+            before = old.get(number)
+            if before is not None and product_fingerprint(before) == product_fingerprint(product_data):
+                continue
+            rows = [CSVExporter._father_row(product_data, plain_text=plain_text, prices=prices)]
+            rows.extend(CSVExporter._child_rows(product_data, prices=prices))
+            if before is not None:
+                # Variants that disappeared are deactivated instead of left active in the Wawi
+                sizes = {variant.size for variant in variants_of(product_data)}
+                gone = [variant for variant in variants_of(before) if variant.size not in sizes]
+                rows.extend(CSVExporter._child_rows(product_data, gone, active=False, prices=prices))
+            yield rows
+        for number, product_data in old.items():
+            if number not in seen:
+                yield [CSVExporter._father_row(product_data, active=False, plain_text=plain_text, prices=prices)]
+
+    @staticmethod
+    def stream_csv(
+        products: Iterable[Dict],
+        compress: bool = False,
+        previous: Optional[Iterable[Dict]] = None,
+        plain_text: bool = False,
+        prices: bool = False,
+    ) -> Iterator[bytes]:
+        """
+        Stream a JTL-Wawi import with a father row and one child row per variant.
+
+        Yields UTF-8 encoded chunks, one per product, so memory use does not
+        grow with the number of products. With ``compress`` the chunks form a
+        single gzip stream.
+
+        In delta mode, when the ``previous`` run is given, only new and
+        changed products are written; variants and products that disappeared
+        get rows with Shopaktiv set to 0. With ``plain_text`` the
+        description is written as text instead of HTML. ``prices`` appends
+        the fVKBrutto and fSonderpreisBrutto columns.
+        """
+        output = io.StringIO()
+        writer = CSVExporter._writer(output)
+        gzip = zlib.compressobj(wbits=31) if compress else None
+
+        def flush() -> bytes:
+            chunk = output.getvalue().encode('utf-8')
+            output.seek(0)
+            output.truncate()
+            return gzip.compress(chunk) if gzip else chunk
+
+        if previous is None:
+            records = (
+                [
+                    CSVExporter._father_row(product_data, plain_text=plain_text, prices=prices),
+                    *CSVExporter._child_rows(product_data, prices=prices),
+                ]
+                for product_data in products
+            )
+        else:
+            records = CSVExporter._delta_rows(previous, products, plain_text, prices)
+
+        writer.writerow(CSVExporter._header(prices))
+        for rows in records:
+            writer.writerows(rows)
+            chunk = flush()
+            if chunk:
+                yield chunk
+
+        chunk = flush()
+        if gzip:
+            chunk += gzip.flush()
+        if chunk:
+            yield chunk
@@ -0,0 +1,138 @@
+from typing import Dict, Iterable, Iterator, List
+from xml.sax.saxutils import XMLGenerator
+import io
+
+from ..sanitizer import html_to_text
+from ..variants import Variant, variants_of
+from .common import GOOGLE_NAMESPACE
+
+# Google only accepts these values for age_group and gender
+AGE_GROUPS = {"Erwachsener": "adult", "Kind": "kids"}
+GENDERS = {"Female": "female", "Male": "male", "Unisex": "unisex"}
+
+MAX_ADDITIONAL_IMAGES = 10
+
+
+class _FeedWriter:
+    """XMLGenerator wrapper that writes indented elements"""
+
+    def __init__(self, out: io.StringIO):
+        self._gen = XMLGenerator(out, encoding="utf-8", short_empty_elements=True)
+        self._depth = 0
+
+    def start_document(self):
+        self._gen.startDocument()
+        self._depth = -1
+
+    def start(self, name: str, attrs: Dict[str, str] = None):
+        self._newline()
+        self._gen.startElement(name, attrs or {})
+        self._depth += 1
+
+    def end(self, name: str):
+        self._depth -= 1
+        self._newline()
+        self._gen.endElement(name)
+
+    def element(self, name: str, text: str):
+        self._newline()
+        self._gen.startElement(name, {})
+        self._gen.characters(text)
+        self._gen.endElement(name)
+
+    def end_document(self):
+        self._gen.ignorableWhitespace("\n")
+        self._gen.endDocument()
+
+    def _newline(self):
+        # The XML declaration already ends with a line break
+        if self._depth < 0:
+            self._depth = 0
+            return
+        self._gen.ignorableWhitespace("\n" + "  " * self._depth)
+
+
+class GoogleFeedExporter:
+    @staticmethod
+    def variant_items(product_data: Dict) -> List[Dict[str, str]]:
+        """
+        Build the Google Merchant attributes of every variant of a product,
+        with availability, price, GTIN and MPN when the variant data has them
+        """
+        meta = product_data.get("metafields", {})
+        artikelnummer = product_data.get("artikelnummer", "")
+        images = product_data.get("bilder", [])
+        base = {
+            "g:item_group_id": artikelnummer,
+            "g:title": product_data.get("name", ""),
+            "g:link": product_data.get("url", ""),
+            "g:brand": meta.get("meta_google:brand", "Blutsgeschwister"),
+            "g:condition": meta.get("meta_google:condition", "New").lower(),
+            "g:age_group": AGE_GROUPS.get(meta.get("meta_google:age_group", ""), "adult"),
+            "g:gender": GENDERS.get(meta.get("meta_google:gender", ""), "female"),
+            "g:google_product_category": meta.get("meta_google:google_product_category", ""),
+            "g:product_type": product_data.get("kategorie", ""),
+        }
+        if images:
+            base["g:image_link"] = images[0]
+
+        items = []
+        for variant in variants_of(product_data) or [Variant("")]:
+            size = variant.size
+            item = {"g:id": f"{artikelnummer}-{size}" if size else artikelnummer, **base}
+            item["g:availability"] = "in stock" if variant.available else "out of stock"
+            if variant.price is not None:
+                item["g:price"] = f"{variant.price:.2f} {variant.currency}"
+            if variant.sale_price is not None:
+                item["g:sale_price"] = f"{variant.sale_price:.2f} {variant.currency}"
+            if variant.ean:
+                item["g:gtin"] = variant.ean
+            if variant.sku:
+                item["g:mpn"] = variant.sku
+            if size:
+                item["g:size"] = size
+            items.append(item)
+        return items
+
+    @staticmethod
+    def generate_feed(products: Iterable[Dict], title: str = "Blutsgeschwister") -> Iterator[bytes]:
+        """
+        Stream an RSS 2.0 Google Merchant feed with one <item> per size variant.
+
+        Yields UTF-8 encoded chunks, one per product.
+        """
+        buffer = io.StringIO()
+        writer = _FeedWriter(buffer)
+
+        def flush() -> bytes:
+            chunk = buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            return chunk
+
+        writer.start_document()
+        writer.start("rss", {"version": "2.0", "xmlns:g": GOOGLE_NAMESPACE})
+        writer.start("channel")
+        writer.element("title", title)
+        writer.element("link", "https://www.blutsgeschwister.de")
+        writer.element("description", f"{title} Produktfeed")
+        yield flush()
+
+        for product_data in products:
+            # Google Merchant expects the description as plain text
+            description = html_to_text(product_data.get("details", "")) or product_data.get("passform", "")
+            images = product_data.get("bilder", [])
+            for item in GoogleFeedExporter.variant_items(product_data):
+                writer.start("item")
+                for tag, value in item.items():
+                    writer.element(tag, value)
+                writer.element("g:description", description)
+                for image in images[1:MAX_ADDITIONAL_IMAGES + 1]:
+                    writer.element("g:additional_image_link", image)
+                writer.end("item")
+            yield flush()
+
+        writer.end("channel")
+        writer.end("rss")
+        writer.end_document()
+        yield flush()
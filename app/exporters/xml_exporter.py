@@ -1,58 +1,160 @@
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Optional
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
 
+from ..changes import field_changes, product_fingerprint
+from ..variants import variants_of
+from .common import GOOGLE_NAMESPACE, cdata_sections
+
+# Status attribute of a product in a delta export
+DELTA_STATUS = {"added": "neu", "changed": "geaendert", "removed": "entfernt"}
+
+
+def _price(value: Optional[float]) -> str:
+    return f"{value:.2f}" if value is not None else ""
+
+
 class XMLExporter:
     @staticmethod
-    def generate_xml(product_data: Dict) -> str:
+    def _product_element(product_data: Dict, fields: Optional[Iterable[str]] = None, parent=None) -> ET.Element:
         """
-        Generate XML from product data with proper namespace handling
+        Build the <produkt> element; with ``fields`` only the article number
+        and those fields are included.
         """
-        # Create root element with namespaces
-        root = ET.Element("produkt", {
-            "xmlns:g": "http://base.google.com/ns/1.0"
-        })
+        attrs = {"xmlns:g": GOOGLE_NAMESPACE} if parent is None else {}
+        root = ET.Element("produkt", attrs) if parent is None else ET.SubElement(parent, "produkt", attrs)
+        include = set(fields) if fields is not None else None
+
+        def wanted(field: str) -> bool:
+            return include is None or field in include
 
         # Add basic product information
         ET.SubElement(root, "artikelnummer").text = product_data.get("artikelnummer", "")
-        ET.SubElement(root, "name").text = product_data.get("name", "")
-        
+        if wanted("name"):
+            ET.SubElement(root, "name").text = product_data.get("name", "")
+
         # Add sizes
-        sizes = ", ".join(product_data.get("groessen", []))
-        ET.SubElement(root, "groessen").text = sizes
+        if wanted("groessen"):
+            sizes = ", ".join(product_data.get("groessen", []))
+            ET.SubElement(root, "groessen").text = sizes
 
         # Add images
-        bilder = ET.SubElement(root, "bilder")
-        for img_url in product_data.get("bilder", []):
-            ET.SubElement(bilder, "bild").text = img_url
+        if wanted("bilder"):
+            bilder = ET.SubElement(root, "bilder")
+            for img_url in product_data.get("bilder", []):
+                ET.SubElement(bilder, "bild").text = img_url
 
-        # Add details with CDATA
-        details = ET.SubElement(root, "details")
-        details_text = product_data.get("details", "")
-        details.text = f"<![CDATA[{details_text}]]>" if details_text else ""
+        # Add details (wrapped in CDATA after serialization)
+        if wanted("details"):
+            ET.SubElement(root, "details")
 
         # Add fit description
-        ET.SubElement(root, "passform").text = product_data.get("passform", "")
+        if wanted("passform"):
+            ET.SubElement(root, "passform").text = product_data.get("passform", "")
 
         # Add category
-        if product_data.get("kategorie"):
+        if wanted("kategorie") and product_data.get("kategorie"):
             ET.SubElement(root, "kategorie").text = product_data.get("kategorie")
 
+        # Add variants with identifiers, prices and stock
+        if wanted("varianten") and product_data.get("varianten"):
+            varianten = ET.SubElement(root, "varianten")
+            for variant in variants_of(product_data):
+                element = ET.SubElement(varianten, "variante")
+                ET.SubElement(element, "groesse").text = variant.size
+                ET.SubElement(element, "sku").text = variant.sku
+                ET.SubElement(element, "ean").text = variant.ean
+                ET.SubElement(element, "preis").text = _price(variant.price)
+                ET.SubElement(element, "sonderpreis").text = _price(variant.sale_price)
+                ET.SubElement(element, "waehrung").text = variant.currency
+                ET.SubElement(element, "verfuegbar").text = "1" if variant.available else "0"
+                ET.SubElement(element, "bestand").text = "" if variant.stock is None else str(variant.stock)
+
         # Add metafields
-        metafields = ET.SubElement(root, "metafields")
-        meta_data = product_data.get("metafields", {})
-        
-        # Add all metafields with proper namespace
-        for key, value in meta_data.items():
-            if key.startswith("meta_google:"):
-                # Convert meta_google:key to g:key format
-                tag_name = key.replace("meta_google:", "g:")
-                ET.SubElement(metafields, tag_name).text = str(value)
+        if wanted("metafields"):
+            metafields = ET.SubElement(root, "metafields")
+            meta_data = product_data.get("metafields", {})
+
+            # Add all metafields with proper namespace
+            for key, value in meta_data.items():
+                if key.startswith("meta_google:"):
+                    # Convert meta_google:key to g:key format
+                    tag_name = key.replace("meta_google:", "g:")
+                    ET.SubElement(metafields, tag_name).text = str(value)
+        return root
+
+    @staticmethod
+    def _serialize(root: ET.Element, details: List[str]) -> str:
+        """Pretty print ``root`` and fill its <details> elements, in order, with CDATA"""
+        # ElementTree cannot write CDATA, so add the sections to the DOM instead
+        document = minidom.parseString(ET.tostring(root, encoding='unicode'))
+        for details_node, details_text in zip(document.getElementsByTagName("details"), details):
+            if not details_text:
+                continue
+            for section in cdata_sections(details_text):
+                details_node.appendChild(document.createCDATASection(section))
 
         # Convert to string with pretty printing
-        xml_str = minidom.parseString(ET.tostring(root, encoding='unicode')).toprettyxml(indent="  ")
-        
+        xml_str = document.toprettyxml(indent="  ")
+
         # Remove empty lines while keeping indentation
         xml_str = "\n".join([line for line in xml_str.split("\n") if line.strip()])
-        
+
         return xml_str
+
+    @staticmethod
+    def generate_xml(product_data: Dict) -> str:
+        """
+        Generate XML from product data with proper namespace handling
+        """
+        root = XMLExporter._product_element(product_data)
+        return XMLExporter._serialize(root, [product_data.get("details", "")])
+
+    @staticmethod
+    def stream_xml(products: Iterable[Dict]) -> Iterator[bytes]:
+        """
+        Stream a <produkte> document with one <produkt> per product.
+
+        Yields UTF-8 encoded chunks, one per product, formatted like the
+        single product export.
+        """
+        yield f'<?xml version="1.0" ?>\n<produkte xmlns:g="{GOOGLE_NAMESPACE}">\n'.encode("utf-8")
+        for product_data in products:
+            root = ET.Element("produkte", {"xmlns:g": GOOGLE_NAMESPACE})
+            XMLExporter._product_element(product_data, parent=root)
+            # Keep only the <produkt> lines between the declaration/root and </produkte>
+            lines = XMLExporter._serialize(root, [product_data.get("details", "")]).split("\n")[2:-1]
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+        yield b"</produkte>\n"
+
+    @staticmethod
+    def generate_delta_xml(previous: Iterable[Dict], current: Iterable[Dict]) -> str:
+        """
+        Generate XML with only the products that differ from a previous run.
+
+        New products are written in full, changed products with their article
+        number and the changed fields, removed products with their article
+        number only. Each <produkt> carries a status attribute.
+        """
+        old = {product["artikelnummer"]: product for product in previous}
+        root = ET.Element("produkte", {"xmlns:g": GOOGLE_NAMESPACE})
+        details: List[str] = []
+        seen = set()
+        for product_data in current:
+            number = product_data["artikelnummer"]
+            seen.add(number)
+            if number not in old:
+                fields, status = None, "added"
+            elif product_fingerprint(product_data) != product_fingerprint(old[number]):
+                fields, status = field_changes(old[number], product_data), "changed"
+            else:
+                continue
+            element = XMLExporter._product_element(product_data, fields, parent=root)
+            element.set("status", DELTA_STATUS[status])
+            if fields is None or "details" in fields:
+                details.append(product_data.get("details", ""))
+        for number in old:
+            if number not in seen:
+                element = XMLExporter._product_element(old[number], (), parent=root)
+                element.set("status", DELTA_STATUS["removed"])
+        return XMLExporter._serialize(root, details)
@@ -0,0 +1,130 @@
+from typing import Dict
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Declarative description of every product field read from the page.
+#
+#   selector  CSS selector of the element(s) holding the value
+#   scope     optional container the selector is applied in (first match)
+#   source    "text" (trimmed textContent), "html" (trimmed innerHTML),
+#             "attr" (attribute value) or "prop" (DOM property, e.g. the
+#             absolute URL of img.src)
+#   attr      attribute or property name for "attr" and "prop"
+#   many      collect all matches instead of the first one
+#   exclude   values dropped from a "many" field
+#   prefix    only keep values of a "many" field starting with this string
+#   join      join a "many" field into a single string
+PRODUCT_FIELDS: Dict[str, Dict] = {
+    "artikelnummer": {
+        "selector": "[data-product-id]",
+        "source": "attr",
+        "attr": "data-product-id",
+    },
+    "name": {
+        "selector": "h1.product-title",
+        "source": "text",
+    },
+    "groessen": {
+        "selector": ".size-selector option:not([disabled])",
+        "source": "text",
+        "many": True,
+        "exclude": ["Größe wählen"],
+    },
+    "bilder": {
+        "selector": ".product-gallery img[src]",
+        "source": "prop",
+        "attr": "src",
+        "many": True,
+        "prefix": "http",
+    },
+    "passform": {
+        "selector": ".product-fit-description, .product-description",
+        "source": "text",
+    },
+    "details": {
+        "selector": ".product-details, .product-information",
+        "source": "html",
+    },
+    # Embedded product JSON (schema.org JSON-LD or the shop's variant data)
+    "produkt_json": {
+        "selector": 'script[type="application/ld+json"], script[type="application/json"][data-product-json]',
+        "source": "text",
+        "many": True,
+    },
+    "kategorie": {
+        "scope": ".breadcrumb",
+        "selector": "a",
+        "source": "text",
+        "many": True,
+        "exclude": ["Home"],
+        "join": " > ",
+    },
+}
+
+# Applies a field spec to the current document in a single evaluate call
+EXTRACT_SCRIPT = """
+(spec) => {
+    const values = {};
+    const errors = {};
+    const empty = (rule) => (rule.many && rule.join === undefined) ? [] : '';
+    const read = (el, rule) => {
+        switch (rule.source) {
+            case 'attr': return el.getAttribute(rule.attr) || '';
+            case 'prop': return el[rule.attr] || '';
+            case 'html': return el.innerHTML.trim();
+            default: return el.textContent.trim();
+        }
+    };
+    for (const [name, rule] of Object.entries(spec)) {
+        try {
+            const root = rule.scope ? document.querySelector(rule.scope) : document;
+            if (!root) {
+                values[name] = empty(rule);
+                continue;
+            }
+            if (rule.many) {
+                let items = Array.from(root.querySelectorAll(rule.selector))
+                    .map(el => read(el, rule))
+                    .filter(value => value);
+                if (rule.exclude) items = items.filter(value => !rule.exclude.includes(value));
+                if (rule.prefix) items = items.filter(value => value.startsWith(rule.prefix));
+                values[name] = rule.join !== undefined ? items.join(rule.join) : items;
+            } else {
+                const element = root.querySelector(rule.selector);
+                values[name] = element ? read(element, rule) : '';
+            }
+        } catch (e) {
+            errors[name] = String(e);
+            values[name] = empty(rule);
+        }
+    }
+    return { values, errors };
+}
+"""
+
+
+def empty_value(rule: Dict):
+    """Value used for a field that could not be found"""
+    return [] if rule.get("many") and "join" not in rule else ""
+
+
+async def extract_fields(page, spec: Dict[str, Dict] = PRODUCT_FIELDS) -> Dict:
+    """
+    Extract all fields of ``spec`` from the page in one round trip.
+
+    Returns ``{"values": {...}, "errors": {...}}``; a field that failed is
+    reported in ``errors`` and set to its empty value.
+    """
+    try:
+        payload = await page.evaluate(EXTRACT_SCRIPT, spec)
+    except Exception as e:
+        logger.error(f"Error extracting product fields: {str(e)}")
+        return {
+            "values": {name: empty_value(rule) for name, rule in spec.items()},
+            "errors": {name: str(e) for name in spec},
+        }
+
+    for name, error in payload["errors"].items():
+        logger.error(f"Error extracting {name}: {error}")
+    return payload
@@ -0,0 +1,131 @@
+from selectolax.parser import HTMLParser
+from typing import Dict, Optional
+from urllib.parse import urljoin
+import logging
+
+import httpx
+
+from . import config
+from .browser_pool import CONTEXT_OPTIONS
+from .extraction import PRODUCT_FIELDS, empty_value
+from .scraper import ProductScraper
+
+logger = logging.getLogger(__name__)
+
+REQUEST_HEADERS = {
+    "User-Agent": CONTEXT_OPTIONS["user_agent"],
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "de-DE,de;q=0.9",
+}
+
+
+def _inner_html(node) -> str:
+    return "".join(child.html or "" for child in node.iter(include_text=True))
+
+
+def _read(node, rule: Dict, base_url: str) -> str:
+    source = rule.get("source", "text")
+    if source == "attr":
+        return node.attributes.get(rule["attr"]) or ""
+    if source == "prop":
+        # Mirror the DOM property, which resolves URLs against the page
+        value = node.attributes.get(rule["attr"]) or ""
+        return urljoin(base_url, value.strip()) if value else ""
+    if source == "html":
+        return _inner_html(node).strip()
+    return node.text(deep=True).strip()
+
+
+def parse_fields(html: str, base_url: str, spec: Dict[str, Dict] = PRODUCT_FIELDS) -> Dict:
+    """
+    Apply the extraction spec to server-rendered HTML.
+
+    Returns the same ``{"values": {...}, "errors": {...}}`` payload as
+    :func:`app.extraction.extract_fields` does for a browser page.
+    """
+    tree = HTMLParser(html)
+    values: Dict = {}
+    errors: Dict[str, str] = {}
+    for name, rule in spec.items():
+        try:
+            root = tree.css_first(rule["scope"]) if rule.get("scope") else tree
+            if root is None:
+                values[name] = empty_value(rule)
+                continue
+            if rule.get("many"):
+                items = [v for v in (_read(node, rule, base_url) for node in root.css(rule["selector"])) if v]
+                if rule.get("exclude"):
+                    items = [v for v in items if v not in rule["exclude"]]
+                if rule.get("prefix"):
+                    items = [v for v in items if v.startswith(rule["prefix"])]
+                values[name] = rule["join"].join(items) if "join" in rule else items
+            else:
+                node = root.css_first(rule["selector"])
+                values[name] = _read(node, rule, base_url) if node is not None else ""
+        except Exception as e:
+            errors[name] = str(e)
+            values[name] = empty_value(rule)
+    return {"values": values, "errors": errors}
+
+
+def diff_products(first: Dict, second: Dict) -> Dict:
+    """Return the fields whose values differ between two product dicts"""
+    return {
+        key: (first.get(key), second.get(key))
+        for key in sorted(set(first) | set(second))
+        if first.get(key) != second.get(key)
+    }
+
+
+class HTTPProductFetcher:
+    """Scrapes product pages over a pooled keep-alive HTTP client, without a browser"""
+
+    def __init__(self, client: Optional[httpx.AsyncClient] = None):
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
+            headers=REQUEST_HEADERS,
+            follow_redirects=True,
+            timeout=httpx.Timeout(config.HTTP_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_CONNECTIONS,
+            ),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def close(self):
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET a page; a 304 answer to a conditional request is returned as is"""
+        response = await self.client.get(url, headers=headers)
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+    def parse_product(self, response: httpx.Response, url: str) -> Dict:
+        """
+        Build the product from a fetched page.
+
+        Produces the same product dict as ProductScraper.scrape_product and
+        raises the same validation errors when the page lacks the data.
+        """
+        extracted = parse_fields(response.text, str(response.url))
+        for name, error in extracted["errors"].items():
+            logger.error(f"Error parsing {name}: {error}")
+
+        product_data = ProductScraper.build_product(extracted["values"], url)
+        ProductScraper.validate_product(product_data)
+        logger.info(f"Parsed product {product_data['artikelnummer']} without browser")
+        return product_data
+
+    async def scrape_product(self, url: str) -> Dict:
+        """Scrape a product from its server-rendered HTML"""
+        logger.info(f"Fetching product page over HTTP: {url}")
+        return self.parse_product(await self.fetch(url), url)
@@ -0,0 +1,320 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import asyncio
+import logging
+import re
+import struct
+import threading
+import time
+
+import httpx
+
+from . import config, db
+from .http_fetcher import REQUEST_HEADERS
+from .metrics import IMAGE_CHECKS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# Query parameters CDNs use to request a rendition of the same asset
+RENDITION_PARAMS = frozenset({"width", "w", "height", "h", "size", "quality", "q", "dpr", "fit", "crop"})
+WIDTH_PARAMS = ("width", "w")
+
+# Size suffixes in file names, e.g. "kleid_800x800.jpg", "kleid_1200x.jpg" or "kleid-x600.jpg"
+SIZE_SUFFIX = re.compile(r"[_-](\d{2,5})?x(\d{2,5})?(?=\.[A-Za-z0-9]+$)")
+
+# Answers that mean the image itself is broken, not the connection to it
+BROKEN_STATUS_CODES = frozenset({400, 401, 403, 404, 410, 451})
+
+
+def _width(value: str) -> Optional[int]:
+    return int(value) if value.isdigit() else None
+
+
+def rendition(url: str) -> Tuple[str, float]:
+    """
+    Canonical asset id of an image URL and the width of the rendition.
+
+    The id is the URL without rendition query parameters and size suffixes;
+    URLs without any size hint are the original asset and count as widest.
+    """
+    parts = urlsplit(url.strip())
+    width: Optional[int] = None
+    query = []
+    for key, value in parse_qsl(parts.query, keep_blank_values=True):
+        if key.lower() in RENDITION_PARAMS:
+            if key.lower() in WIDTH_PARAMS and width is None:
+                width = _width(value)
+            continue
+        query.append((key, value))
+    path = parts.path
+    match = SIZE_SUFFIX.search(path)
+    if match and (match.group(1) or match.group(2)):
+        path = path[:match.start()] + path[match.end():]
+        if width is None:
+            width = _width(match.group(1) or match.group(2))
+    asset_id = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(sorted(query)), ""))
+    return asset_id, float("inf") if width is None else float(width)
+
+
+def select_renditions(urls: Iterable[str]) -> Tuple[List[str], int]:
+    """
+    Keep the widest rendition of every asset, in order of first appearance.
+
+    Returns the URLs and the number of duplicates that were dropped.
+    """
+    best: Dict[str, Tuple[float, str]] = {}
+    total = 0
+    for url in urls:
+        total += 1
+        asset_id, width = rendition(url)
+        if asset_id not in best or width > best[asset_id][0]:
+            # Dicts keep insertion order, so replacing a value keeps the first position
+            best[asset_id] = (width, url)
+    return [url for _, url in best.values()], total - len(best)
+
+
+def image_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """Width and height from the header of a PNG, GIF, JPEG or WebP file"""
+    try:
+        if data.startswith(b"\x89PNG\r\n\x1a\n") and data[12:16] == b"IHDR":
+            return struct.unpack(">II", data[16:24])
+        if data[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", data[6:10])
+        if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+            chunk = data[12:16]
+            if chunk == b"VP8 ":
+                width, height = struct.unpack("<HH", data[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            if chunk == b"VP8L":
+                bits = int.from_bytes(data[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            if chunk == b"VP8X":
+                return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+        if data[:2] == b"\xff\xd8":
+            position = 2
+            while position + 9 < len(data):
+                if data[position] != 0xFF:
+                    return None
+                marker = data[position + 1]
+                if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                    position += 2
+                    continue
+                length = struct.unpack(">H", data[position + 2:position + 4])[0]
+                # Start of frame markers, except DHT (C4), JPG (C8) and DAC (CC)
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack(">HH", data[position + 5:position + 9])
+                    return width, height
+                position += 2 + length
+    except struct.error:
+        return None
+    return None
+
+
+class ImageInfo:
+    """Result of checking one image URL"""
+
+    def __init__(
+        self,
+        url: str,
+        ok: bool,
+        status: Optional[int] = None,
+        content_type: Optional[str] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        size: Optional[int] = None,
+        error: Optional[str] = None,
+        checked_at: Optional[float] = None,
+    ):
+        self.url = url
+        self.ok = ok
+        self.status = status
+        self.content_type = content_type
+        self.width = width
+        self.height = height
+        self.size = size
+        self.error = error
+        self.checked_at = checked_at or time.time()
+
+    def to_dict(self) -> Dict:
+        return {
+            "url": self.url,
+            "ok": self.ok,
+            "status": self.status,
+            "content_type": self.content_type,
+            "width": self.width,
+            "height": self.height,
+            "bytes": self.size,
+            "error": self.error,
+        }
+
+
+class ImageCache:
+    """SQLite cache of image checks keyed by URL, valid for ``ttl`` seconds"""
+
+    def __init__(self, path: str = config.IMAGE_CACHE_PATH, ttl: float = config.IMAGE_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = db.connect(path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                url TEXT PRIMARY KEY,
+                ok INTEGER NOT NULL,
+                status INTEGER,
+                content_type TEXT,
+                width INTEGER,
+                height INTEGER,
+                size INTEGER,
+                error TEXT,
+                checked_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def get_many(self, urls: List[str]) -> Dict[str, ImageInfo]:
+        """Fresh checks of the given URLs"""
+        if not urls:
+            return {}
+        placeholders = ", ".join("?" for _ in urls)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT url, ok, status, content_type, width, height, size, error, checked_at "
+                f"FROM images WHERE checked_at >= ? AND url IN ({placeholders})",
+                (time.time() - self.ttl, *urls),
+            ).fetchall()
+        return {row[0]: ImageInfo(row[0], bool(row[1]), *row[2:]) for row in rows}
+
+    def put_many(self, infos: List[ImageInfo]):
+        if not infos:
+            return
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (info.url, int(info.ok), info.status, info.content_type, info.width,
+                     info.height, info.size, info.error, info.checked_at)
+                    for info in infos
+                ],
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class ImagePipeline:
+    """
+    Cleans the gallery images of a product before it is exported.
+
+    Resized duplicates of an asset are collapsed to the widest rendition. The
+    remaining URLs are checked concurrently over a pooled HTTP client, reading
+    only the first ``probe_bytes`` of each image for its dimensions; results
+    are cached by URL. Images the CDN reports as missing or that are not
+    images are dropped, images that could not be reached are kept unchecked.
+    """
+
+    def __init__(
+        self,
+        client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[ImageCache] = None,
+        concurrency: int = config.IMAGE_CONCURRENCY,
+        probe_bytes: int = config.IMAGE_PROBE_BYTES,
+    ):
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
+            headers={**REQUEST_HEADERS, "Accept": "image/avif,image/webp,image/*,*/*;q=0.8"},
+            follow_redirects=True,
+            timeout=httpx.Timeout(config.IMAGE_TIMEOUT),
+            limits=httpx.Limits(max_connections=max(1, concurrency), max_keepalive_connections=max(1, concurrency)),
+        )
+        self.cache = cache
+        self.probe_bytes = max(1024, probe_bytes)
+        # Shared by all products, so parallel scrapes do not multiply the load on the CDN
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def close(self):
+        if self._owns_client:
+            await self.client.aclose()
+        if self.cache:
+            self.cache.close()
+
+    async def probe(self, url: str) -> ImageInfo:
+        """Check a single image with a ranged GET of its first bytes"""
+        async with self._semaphore:
+            try:
+                headers = {"Range": f"bytes=0-{self.probe_bytes - 1}"}
+                async with self.client.stream("GET", url, headers=headers) as response:
+                    status = response.status_code
+                    content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                    if status >= 400:
+                        broken = status in BROKEN_STATUS_CODES
+                        return ImageInfo(url, not broken, status, content_type or None, error=f"HTTP {status}")
+                    data = bytearray()
+                    async for chunk in response.aiter_bytes():
+                        data.extend(chunk)
+                        if len(data) >= self.probe_bytes:
+                            break
+                    size = _content_size(response, len(data))
+            except httpx.HTTPError as e:
+                return ImageInfo(url, True, error=f"{type(e).__name__}: {str(e)}")
+        dimensions = image_dimensions(bytes(data))
+        if not content_type.startswith("image/") and dimensions is None:
+            return ImageInfo(url, False, status, content_type or None, size=size, error="Keine Bilddatei")
+        if not data:
+            return ImageInfo(url, False, status, content_type, size=0, error="Leere Bilddatei")
+        width, height = dimensions or (None, None)
+        return ImageInfo(url, True, status, content_type or None, width, height, size)
+
+    async def check(self, urls: List[str]) -> List[ImageInfo]:
+        """Check all URLs at once, using cached results where available"""
+        cached = await asyncio.to_thread(self.cache.get_many, urls) if self.cache else {}
+        missing = [url for url in urls if url not in cached]
+        probed = await asyncio.gather(*(self.probe(url) for url in missing))
+        # Unreachable images are retried on the next scrape instead of being cached
+        if self.cache:
+            await asyncio.to_thread(self.cache.put_many, [info for info in probed if info.error is None or not info.ok])
+        for info in probed:
+            IMAGE_CHECKS_TOTAL.inc(result=_outcome(info))
+        if cached:
+            IMAGE_CHECKS_TOTAL.inc(len(cached), result="cached")
+        results = {**cached, **{info.url: info for info in probed}}
+        return [results[url] for url in urls]
+
+    async def apply(self, product_data: Dict, report: Dict) -> Dict:
+        """
+        Return the product with de-duplicated, checked images and add an
+        ``images`` summary with the metadata of every checked image to ``report``.
+
+        The de-duplicated gallery before the checks is kept as ``bilder_quelle``
+        for change detection.
+        """
+        urls, duplicates = select_renditions(product_data.get("bilder", []))
+        infos = await self.check(urls)
+        dropped = [info.url for info in infos if not info.ok]
+        for url in dropped:
+            logger.warning(f"Dropping broken image {url}")
+        report["images"] = {
+            "found": len(product_data.get("bilder", [])),
+            "duplicates": duplicates,
+            "dropped": dropped,
+            "checked": [info.to_dict() for info in infos],
+        }
+        return {**product_data, "bilder": [info.url for info in infos if info.ok], "bilder_quelle": urls}
+
+
+def _outcome(info: ImageInfo) -> str:
+    if not info.ok:
+        return "broken"
+    return "ok" if info.error is None else "unreachable"
+
+
+def _content_size(response: httpx.Response, read: int) -> Optional[int]:
+    """Full size of the image from Content-Range, Content-Length or the bytes read"""
+    content_range = response.headers.get("content-range", "")
+    if "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        if total.isdigit():
+            return int(total)
+    if response.status_code == 200 and response.headers.get("content-length", "").isdigit():
+        return int(response.headers["content-length"])
+    return read if response.is_stream_consumed else None
@@ -0,0 +1,422 @@
+from typing import AsyncIterator, Dict, Optional, Tuple
+import asyncio
+import json
+import logging
+import multiprocessing
+import sqlite3
+import threading
+import time
+import uuid
+
+from . import config, db
+from .browser_pool import BrowserPool
+from .cache import ProductCache
+from .http_fetcher import HTTPProductFetcher
+from .images import ImageCache, ImagePipeline
+from .resilience import ProductGoneError, ScrapeError
+from .resource_blocking import LoadOptions
+from .service import ScrapeService
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed", "failed")
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue already holds the maximum number of waiting jobs"""
+
+
+class JobQueue:
+    """
+    Scrape jobs in a SQLite file shared by the web process and the workers.
+
+    A job is claimed atomically by one worker, and is put back into the queue
+    on failure until it has used up its retries. A claim is a lease that the
+    worker renews while it runs; jobs whose lease expired belong to a worker
+    that died, in this or any other web process, and are queued again. Only
+    the worker holding the claim can finish a job, so late results of a worker
+    whose job was requeued are ignored.
+    """
+
+    def __init__(self, path: str = config.JOB_QUEUE_PATH, max_depth: int = config.JOB_MAX_QUEUE_DEPTH):
+        self.max_depth = max(1, max_depth)
+        self._lock = threading.Lock()
+        self._db = db.connect(path)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                options TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_retries INTEGER NOT NULL,
+                worker TEXT,
+                product TEXT,
+                report TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        """)
+        db.add_columns(self._db, "jobs", {"error_type": "TEXT", "lease_until": "REAL", "stored_at": "REAL"})
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._db.commit()
+
+    def enqueue(
+        self,
+        url: str,
+        load_options: Optional[LoadOptions] = None,
+        force: bool = False,
+        max_retries: int = config.JOB_MAX_RETRIES,
+    ) -> Dict:
+        """Add a job for ``url``; raises QueueFullError when the queue is full"""
+        options = {"force": force}
+        if load_options:
+            options["mode"] = load_options.mode
+            options["blocked_domains"] = sorted(load_options.blocked_domains)
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            depth = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if depth >= self.max_depth:
+                raise QueueFullError(f"Job queue is full ({depth} waiting jobs)")
+            self._db.execute(
+                "INSERT INTO jobs (id, url, options, status, max_retries, created_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, url, json.dumps(options), max(0, max_retries), time.time()),
+            )
+            self._db.commit()
+        return self.get(job_id)
+
+    def claim(self, worker: str, lease: float = config.JOB_LEASE_TIMEOUT) -> Optional[Dict]:
+        """Mark the oldest queued job as running for ``worker`` and return it"""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, started_at = ?, "
+                "lease_until = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1) "
+                "RETURNING *",
+                (worker, now, now + lease),
+            ).fetchone()
+            self._db.commit()
+        return self._to_dict(row) if row else None
+
+    def renew(self, worker: str, lease: float = config.JOB_LEASE_TIMEOUT) -> int:
+        """Extend the lease of the jobs ``worker`` is running"""
+        with self._lock:
+            renewed = self._db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE status = 'running' AND worker = ?",
+                (time.time() + lease, worker),
+            ).rowcount
+            self._db.commit()
+        return renewed
+
+    def complete(self, job_id: str, worker: str, product_data: Dict, report: Dict) -> bool:
+        """Store the product of a job ``worker`` is running; False if the job is no longer its own"""
+        with self._lock:
+            completed = self._db.execute(
+                "UPDATE jobs SET status = 'completed', product = ?, report = ?, error = NULL, error_type = NULL, "
+                "lease_until = NULL, finished_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(product_data, ensure_ascii=False), json.dumps(report), time.time(), job_id, worker),
+            ).rowcount
+            self._db.commit()
+        return completed == 1
+
+    def fail(
+        self, job_id: str, worker: str, error: str, error_type: Optional[str] = None, retry: bool = True
+    ) -> Optional[str]:
+        """
+        Record a failed attempt of a job ``worker`` is running; the job is
+        queued again while retries are left. Returns the new status, or None
+        if the job is no longer the worker's own.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "UPDATE jobs SET error = ?, error_type = ?, worker = NULL, lease_until = NULL, "
+                "status = CASE WHEN ? AND attempts <= max_retries THEN 'queued' ELSE 'failed' END, "
+                "finished_at = CASE WHEN ? AND attempts <= max_retries THEN NULL ELSE ? END "
+                "WHERE id = ? AND worker = ? AND status = 'running' "
+                "RETURNING status",
+                (error, error_type, retry, retry, time.time(), job_id, worker),
+            ).fetchone()
+            self._db.commit()
+        return row["status"] if row else None
+
+    def release_worker(self, worker: str) -> int:
+        """Put the running jobs of a crashed worker back into the queue"""
+        with self._lock:
+            running = self._db.execute(
+                "SELECT id FROM jobs WHERE status = 'running' AND worker = ?", (worker,)
+            ).fetchall()
+        for row in running:
+            self.fail(row["id"], worker, "Worker-Prozess wurde unerwartet beendet.")
+        return len(running)
+
+    def requeue_expired(self) -> int:
+        """Put running jobs whose lease expired back into the queue"""
+        with self._lock:
+            expired = self._db.execute(
+                "SELECT id, worker FROM jobs WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)",
+                (time.time(),),
+            ).fetchall()
+        for row in expired:
+            self.fail(row["id"], row["worker"], "Worker-Prozess wurde unerwartet beendet.")
+        return len(expired)
+
+    def mark_stored(self, job_id: str) -> bool:
+        """Claim storing the product of a completed job; True only for the first caller"""
+        with self._lock:
+            marked = self._db.execute(
+                "UPDATE jobs SET stored_at = ? WHERE id = ? AND status = 'completed' AND stored_at IS NULL",
+                (time.time(), job_id),
+            ).rowcount
+            self._db.commit()
+        return marked == 1
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def stats(self) -> Dict:
+        """Number of jobs per status"""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in ("queued", "running", "completed", "failed")}
+        counts.update({row[0]: row[1] for row in rows})
+        return counts
+
+    def purge(self, max_age: float = config.RESULT_TTL) -> int:
+        """Delete finished jobs older than ``max_age`` seconds"""
+        with self._lock:
+            deleted = self._db.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND finished_at < ?",
+                (time.time() - max_age,),
+            ).rowcount
+            self._db.commit()
+        return deleted
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        return {
+            "job_id": row["id"],
+            "url": row["url"],
+            "options": json.loads(row["options"]),
+            "status": row["status"],
+            "attempts": row["attempts"],
+            "max_retries": row["max_retries"],
+            "product": json.loads(row["product"]) if row["product"] else None,
+            "report": json.loads(row["report"]) if row["report"] else None,
+            "error": row["error"],
+            "error_type": row["error_type"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+            "stored_at": row["stored_at"],
+        }
+
+
+def _load_options(options: Dict) -> Optional[LoadOptions]:
+    if "mode" not in options:
+        return None
+    return LoadOptions(mode=options["mode"], blocked_domains=options.get("blocked_domains"))
+
+
+async def _work(worker: str, queue_path: str, stop) -> None:
+    pool = BrowserPool(size=1)
+    try:
+        await pool.start()
+    except Exception as e:
+        logger.error(f"{worker}: could not start browser pool: {str(e)}")
+        pool = None
+    fetcher = HTTPProductFetcher() if config.HTTP_FAST_PATH else None
+    cache = ProductCache() if config.CACHE_ENABLED else None
+    images = ImagePipeline(cache=ImageCache()) if config.IMAGE_CHECK else None
+    service = ScrapeService(pool, fetcher, cache, images=images)
+    queue = JobQueue(queue_path)
+
+    async def heartbeat():
+        # Keeps the lease of the running job, so other processes do not requeue it
+        while True:
+            await asyncio.sleep(config.JOB_LEASE_TIMEOUT / 3)
+            await asyncio.to_thread(queue.renew, worker)
+
+    renewer = asyncio.create_task(heartbeat())
+    logger.info(f"{worker} ready")
+    try:
+        while not stop.is_set():
+            job = await asyncio.to_thread(queue.claim, worker)
+            if job is None:
+                await asyncio.sleep(config.JOB_POLL_INTERVAL)
+                continue
+            options = job["options"]
+            try:
+                product_data, report = await service.scrape(
+                    job["url"], _load_options(options), force=options.get("force", False)
+                )
+            except Exception as e:
+                error = str(e) or "Scraping timeout"
+                # A missing page stays missing, retrying it only delays the answer
+                status = await asyncio.to_thread(
+                    queue.fail, job["job_id"], worker, error, type(e).__name__, not isinstance(e, ProductGoneError)
+                )
+                logger.error(f"{worker}: job {job['job_id']} failed ({status or 'ignored, job was requeued'}): {error}")
+                continue
+            if not await asyncio.to_thread(queue.complete, job["job_id"], worker, product_data, report):
+                logger.warning(f"{worker}: result of job {job['job_id']} ignored, the job was requeued")
+    finally:
+        renewer.cancel()
+        await asyncio.gather(renewer, return_exceptions=True)
+        queue.close()
+        if fetcher:
+            await fetcher.close()
+        if cache:
+            cache.close()
+        if images:
+            await images.close()
+        if pool:
+            await pool.close()
+
+
+def worker_main(worker: str, queue_path: str, stop) -> None:
+    """Entry point of a worker process: scrape queued jobs until ``stop`` is set"""
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_work(worker, queue_path, stop))
+    except KeyboardInterrupt:
+        pass
+
+
+class WorkerPool:
+    """
+    Scrape worker processes, each with its own browser, fed by a JobQueue.
+
+    Workers that die are restarted and their running jobs requeued.
+    """
+
+    def __init__(self, queue: JobQueue, queue_path: str = config.JOB_QUEUE_PATH, workers: int = config.JOB_WORKERS):
+        self.queue = queue
+        self.queue_path = queue_path
+        self.size = max(1, workers)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._stop = self._ctx.Event()
+        self._processes: Dict[str, multiprocessing.Process] = {}
+        self._supervisor: Optional[asyncio.Task] = None
+        # Worker ids must be unique across web processes sharing the queue file
+        self._instance = uuid.uuid4().hex[:8]
+        self.restarts = 0
+
+    def _spawn(self, worker: str):
+        process = self._ctx.Process(
+            target=worker_main, args=(worker, self.queue_path, self._stop), name=worker, daemon=True
+        )
+        process.start()
+        self._processes[worker] = process
+
+    def start(self):
+        logger.info(f"Starting {self.size} scrape worker processes...")
+        # Jobs whose lease expired were interrupted by the last shutdown or a dead process
+        self.queue.requeue_expired()
+        for i in range(self.size):
+            self._spawn(f"worker-{self._instance}-{i}")
+        self._supervisor = asyncio.create_task(self._supervise())
+
+    async def _supervise(self):
+        while not self._stop.is_set():
+            await asyncio.sleep(config.JOB_SUPERVISE_INTERVAL)
+            for worker, process in list(self._processes.items()):
+                if process.is_alive() or self._stop.is_set():
+                    continue
+                requeued = await asyncio.to_thread(self.queue.release_worker, worker)
+                logger.warning(f"{worker} exited with code {process.exitcode}, restarting ({requeued} jobs requeued)")
+                self.restarts += 1
+                self._spawn(worker)
+            await asyncio.to_thread(self.queue.requeue_expired)
+            await asyncio.to_thread(self.queue.purge)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.size,
+            "alive": sum(process.is_alive() for process in self._processes.values()),
+            "restarts": self.restarts,
+        }
+
+    async def close(self, timeout: float = config.POOL_DRAIN_TIMEOUT):
+        """Let workers finish their current job, then terminate stragglers"""
+        self._stop.set()
+        if self._supervisor:
+            self._supervisor.cancel()
+            await asyncio.gather(self._supervisor, return_exceptions=True)
+        deadline = time.monotonic() + timeout
+        for process in self._processes.values():
+            await asyncio.to_thread(process.join, max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"{process.name} did not stop in time, terminating")
+                process.terminate()
+                await asyncio.to_thread(process.join, 5)
+        logger.info("Scrape workers stopped")
+
+
+class QueuedScrapeService:
+    """
+    Scrapes through the job queue, with the same ``scrape`` call as
+    ScrapeService, so batches and crawls run in the worker processes.
+    """
+
+    def __init__(self, queue: JobQueue, poll_interval: float = config.JOB_POLL_INTERVAL):
+        self.queue = queue
+        self.poll_interval = poll_interval
+
+    async def scrape(
+        self,
+        url: str,
+        load_options: Optional[LoadOptions] = None,
+        force: bool = False,
+    ) -> Tuple[Dict, Dict]:
+        while True:
+            try:
+                job = await asyncio.to_thread(self.queue.enqueue, url, load_options, force)
+                break
+            except QueueFullError:
+                # Wait for the workers instead of failing the URL
+                await asyncio.sleep(self.poll_interval)
+        while job["status"] not in FINISHED_STATUSES:
+            await asyncio.sleep(self.poll_interval)
+            job = await asyncio.to_thread(self.queue.get, job["job_id"])
+            if job is None:
+                raise ScrapeError("Der Scrape-Auftrag wurde gelöscht.")
+        if job["status"] == "failed":
+            if job["error_type"] == ProductGoneError.__name__:
+                raise ProductGoneError(job["error"])
+            raise ScrapeError(job["error"])
+        return job["product"], job["report"]
+
+
+async def watch_job(queue: JobQueue, job_id: str, keepalive: float = 15.0) -> AsyncIterator[Optional[Dict]]:
+    """
+    Yield the job whenever its status or attempt count changes, until it is
+    finished; ``None`` is yielded after ``keepalive`` seconds without change.
+    """
+    last_state = None
+    last_sent = time.monotonic()
+    while True:
+        job = await asyncio.to_thread(queue.get, job_id)
+        if job is None:
+            return
+        state = (job["status"], job["attempts"])
+        if state != last_state:
+            last_state = state
+            last_sent = time.monotonic()
+            yield job
+            if job["status"] in FINISHED_STATUSES:
+                return
+        elif time.monotonic() - last_sent > keepalive:
+            last_sent = time.monotonic()
+            yield None
+        await asyncio.sleep(config.JOB_POLL_INTERVAL)
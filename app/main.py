@@ -1,52 +1,222 @@
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse, Response
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pathlib import Path
 import logging
-from typing import Dict
+from typing import Dict, Optional
 import json
 import asyncio
+import sys
+import time
+from contextlib import asynccontextmanager, suppress
+from importlib import import_module
 
-from .scraper import ProductScraper
-from .exporters import XMLExporter, CSVExporter
+from . import config, exporters
+from .batch import BatchManager
+from .browser_pool import BrowserPool
+from .crawler import CrawlState, Crawler
+from .cache import ProductCache
+from .categories import get_category_mapper
+from .changes import RunStore, comparable_base, delta_products, diff_runs
+from .http_fetcher import HTTPProductFetcher
+from .images import ImageCache, ImagePipeline
+from .jobs import JobQueue, QueuedScrapeService, QueueFullError, WorkerPool, watch_job
+from .metrics import CACHE_GAUGE, JOB_GAUGE, POOL_GAUGE, REGISTRY, timed_export, timed_stream
+from .resilience import CircuitOpenError
+from .resource_blocking import LoadOptions
+from .results import create_result_store
+from .scraper import BASE_URL, is_product_url
+from .service import ScrapeService
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Blutsgeschwister Product Scraper")
+# Modules only needed for browser scrapes and downloads, imported by the warm-up
+WARMUP_MODULES = (
+    "playwright.async_api",
+    "app.exporters.xml_exporter",
+    "app.exporters.csv_exporter",
+    "app.exporters.feed_exporter",
+)
+
+def _preload_modules(browser: bool):
+    for module in WARMUP_MODULES:
+        if browser or not module.startswith("playwright"):
+            import_module(module)
+
+async def _warm_up(app: FastAPI):
+    """Import Playwright and the exporters and start the browser pool, off the request path."""
+    readiness = app.state.readiness
+    started = time.perf_counter()
+    pool = None
+    try:
+        await asyncio.to_thread(_preload_modules, app.state.jobs is None)
+        # With scrape workers the browsers run in the worker processes
+        if app.state.jobs is None:
+            pool = BrowserPool()
+            await pool.start()
+    except asyncio.CancelledError:
+        if pool:
+            await pool.close()
+        raise
+    except Exception as e:
+        # Fall back to a browser per request rather than refusing to serve
+        logger.error(f"Could not start browser pool: {str(e)}")
+        readiness["browser_pool"] = "unavailable"
+    else:
+        if pool:
+            app.state.browser_pool = pool
+            app.state.scraper.pool = pool
+        readiness["browser_pool"] = "warm" if pool else "workers"
+    readiness["warmup_seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(f"Warm-up finished in {readiness['warmup_seconds']}s, browser pool {readiness['browser_pool']}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the stores and HTTP clients on startup, warm up the browser pool, and drain everything on shutdown."""
+    # Fail on startup, not on the first scrape, when the mapping table is broken
+    get_category_mapper()
+    app.state.browser_pool = None
+    app.state.readiness = {"browser_pool": "starting", "warmup_seconds": None}
+    fetcher = HTTPProductFetcher() if config.HTTP_FAST_PATH else None
+    cache = ProductCache() if config.CACHE_ENABLED else None
+    images = ImagePipeline(cache=ImageCache()) if config.IMAGE_CHECK else None
+    app.state.scraper = ScrapeService(None, fetcher, cache, images=images)
+    app.state.results = create_result_store()
+    app.state.runs = RunStore()
+    app.state.batches = BatchManager(app.state.results, runs=app.state.runs)
+    app.state.jobs = JobQueue() if config.JOB_WORKERS > 0 else None
+    app.state.workers = WorkerPool(app.state.jobs) if app.state.jobs else None
+    # Batches and crawls scrape in the worker processes when there are any
+    app.state.bulk_scraper = QueuedScrapeService(app.state.jobs) if app.state.jobs else app.state.scraper
+    app.state.crawler = Crawler(app.state.bulk_scraper, CrawlState(), app.state.results)
+    if app.state.workers:
+        app.state.workers.start()
+    # The browser starts in the background so pages and downloads are served right away
+    app.state.warmup = asyncio.create_task(_warm_up(app))
+    app.state.scraper.warmup = app.state.warmup
+    if config.STARTUP_MODE == "eager":
+        await app.state.warmup
+    yield
+    if not app.state.warmup.done():
+        app.state.warmup.cancel()
+        with suppress(asyncio.CancelledError):
+            await app.state.warmup
+    if app.state.workers:
+        await app.state.workers.close()
+        app.state.jobs.close()
+    await app.state.crawler.close()
+    await app.state.batches.shutdown()
+    if fetcher:
+        await fetcher.close()
+    if cache:
+        cache.close()
+    if images:
+        await images.close()
+    app.state.results.close()
+    app.state.runs.close()
+    if app.state.browser_pool:
+        await app.state.browser_pool.close()
+
+app = FastAPI(title="Blutsgeschwister Product Scraper", lifespan=lifespan)
 
 # Mount templates and static directories
 templates = Jinja2Templates(directory="app/templates")
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
-# Store scraped data temporarily (in a production environment, use a proper database)
-SCRAPED_DATA: Dict = {}
-
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Render the home page with the input form."""
     return templates.TemplateResponse("index.html", {"request": request})
 
+def _is_true(value) -> bool:
+    """Interpret a form or JSON flag such as force=true."""
+    if isinstance(value, bool):
+        return value
+    return str(value or "").strip().lower() in ("1", "true", "yes", "on")
+
+def _load_options(params) -> LoadOptions:
+    """Read the page load mode and extra blocked domains from request parameters."""
+    try:
+        return LoadOptions.from_params(params.get("load_mode"), params.get("blocklist"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _product_summary(product_data: Dict) -> Dict:
+    """Short description of a scraped product for the web interface."""
+    return {
+        "name": product_data.get("name", ""),
+        "artikelnummer": product_data.get("artikelnummer", ""),
+        "groessen": product_data.get("groessen", []),
+        "bilder_count": len(product_data.get("bilder", [])),
+    }
+
+async def _job_response(request: Request, job: Dict) -> Dict:
+    """Public state of a queued scrape; a completed product is stored for download once."""
+    response = {
+        "job_id": job["job_id"],
+        "url": job["url"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "max_retries": job["max_retries"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "status_url": f"/jobs/{job['job_id']}",
+        "events_url": f"/jobs/{job['job_id']}/events",
+    }
+    product_data = job["product"]
+    if job["status"] == "completed" and product_data:
+        product_id = product_data["artikelnummer"]
+        if job["stored_at"] is None and await asyncio.to_thread(request.app.state.jobs.mark_stored, job["job_id"]):
+            await asyncio.to_thread(request.app.state.results.put, product_id, [product_data])
+        response.update({
+            "message": "Daten erfolgreich extrahiert",
+            "id": product_id,
+            "data": _product_summary(product_data),
+            **(job["report"] or {}),
+        })
+    return response
+
 @app.post("/scrape")
 async def scrape_product(request: Request):
-    """Handle product URL submission and trigger scraping."""
+    """Handle product URL submission and trigger scraping.
+
+    With scrape workers enabled the URL is queued and a job is returned right
+    away (202); poll its ``status_url`` or follow its ``events_url``.
+    """
     try:
         form = await request.form()
         product_url = form.get("product_url")
         
-        if not product_url or not product_url.startswith("https://www.blutsgeschwister.de/de"):
+        if not is_product_url(product_url):
             raise HTTPException(
                 status_code=400, 
-                detail="Invalid Blutsgeschwister product URL. URL must start with 'https://www.blutsgeschwister.de/de'"
+                detail=f"Invalid Blutsgeschwister product URL. URL must start with '{BASE_URL}'"
             )
+        load_options = _load_options(form)
+        force = _is_true(form.get("force") or request.query_params.get("force"))
+
+        jobs = request.app.state.jobs
+        if jobs:
+            try:
+                job = await asyncio.to_thread(jobs.enqueue, product_url, load_options, force)
+            except QueueFullError as e:
+                logger.error(str(e))
+                raise HTTPException(
+                    status_code=503,
+                    detail="Die Warteschlange ist voll. Bitte versuchen Sie es später erneut."
+                )
+            return JSONResponse(status_code=202, content=await _job_response(request, job))
         
         # Set a longer timeout for scraping
         try:
-            async with asyncio.timeout(120):  # 120 seconds timeout
-                async with ProductScraper() as scraper:
-                    product_data = await scraper.scrape_product(product_url)
+            product_data, report = await request.app.state.scraper.scrape(product_url, load_options, force=force)
+        except CircuitOpenError as e:
+            raise HTTPException(status_code=503, detail=str(e))
         except asyncio.TimeoutError:
             logger.error("Scraping timeout")
             raise HTTPException(
@@ -60,20 +230,17 @@ async def scrape_product(request: Request):
                 detail=f"Error during scraping: {str(e)}"
             )
             
-        # Store the scraped data
-        SCRAPED_DATA.clear()  # Clear previous data
-        SCRAPED_DATA.update(product_data)
+        # Store the scraped data for download under its article number
+        product_id = product_data["artikelnummer"]
+        await asyncio.to_thread(request.app.state.results.put, product_id, [product_data])
         
         # Return a summary of the scraped data
         return {
             "status": "success",
             "message": "Daten erfolgreich extrahiert",
-            "data": {
-                "name": product_data.get("name", ""),
-                "artikelnummer": product_data.get("artikelnummer", ""),
-                "groessen": product_data.get("groessen", []),
-                "bilder_count": len(product_data.get("bilder", [])),
-            }
+            "id": product_id,
+            "data": _product_summary(product_data),
+            **report,
         }
         
     except HTTPException:
@@ -85,30 +252,307 @@ async def scrape_product(request: Request):
             detail=f"Ein unerwarteter Fehler ist aufgetreten: {str(e)}"
         )
 
+async def _read_batch_request(request: Request) -> Dict:
+    """Read URLs and options from a JSON body or an uploaded text file."""
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid JSON body.")
+        if not isinstance(payload, dict):
+            raise HTTPException(status_code=400, detail="JSON body must be an object.")
+        urls = payload.get("urls")
+        if not isinstance(urls, list):
+            raise HTTPException(status_code=400, detail="'urls' must be a list of product URLs.")
+        options = payload
+    else:
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Upload a text file with one URL per line as 'file'.")
+        text = (await upload.read()).decode("utf-8", errors="replace")
+        urls = text.splitlines()
+        options = form
+
+    try:
+        concurrency = int(options.get("concurrency") or config.BATCH_CONCURRENCY)
+        host_interval = float(options.get("host_interval") or config.BATCH_HOST_INTERVAL)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="'concurrency' and 'host_interval' must be numbers.")
+
+    # Drop blanks and duplicates while keeping the submitted order
+    urls = list(dict.fromkeys(str(url).strip() for url in urls if str(url).strip()))
+    return {
+        "urls": urls,
+        "concurrency": concurrency,
+        "host_interval": host_interval,
+        "load_options": _load_options(options),
+        "force": _is_true(options.get("force")),
+    }
+
+@app.post("/batch", status_code=202)
+async def start_batch(request: Request):
+    """Start scraping a list of product URLs in the background."""
+    batch = await _read_batch_request(request)
+    urls = batch["urls"]
+
+    if not urls:
+        raise HTTPException(status_code=400, detail="No product URLs submitted.")
+    if len(urls) > config.BATCH_MAX_URLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many URLs. A batch may contain at most {config.BATCH_MAX_URLS} URLs."
+        )
+    invalid = [url for url in urls if not is_product_url(url)]
+    if invalid:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid Blutsgeschwister product URLs: {', '.join(invalid[:5])}"
+        )
+
+    job = request.app.state.batches.submit(
+        urls,
+        request.app.state.bulk_scraper,
+        concurrency=batch["concurrency"],
+        host_interval=batch["host_interval"],
+        load_options=batch["load_options"],
+        force=batch["force"],
+    )
+    return job.to_dict(include_results=False)
+
+@app.get("/batch/{job_id}")
+async def batch_status(request: Request, job_id: str, results: bool = True):
+    """Report progress and per-URL results of a batch job."""
+    job = request.app.state.batches.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found.")
+    return job.to_dict(include_results=results)
+
+@app.get("/runs")
+async def list_runs(request: Request):
+    """List the recorded batch runs that can be compared."""
+    return await asyncio.to_thread(request.app.state.runs.list)
+
+async def _run_pair(request: Request, run_id: str, base: Optional[str]):
+    """Products of a run and of the run it is compared with (the previous one by default).
+
+    The base is limited to the URLs the run requested, and a product only counts
+    as removed when its page answered 404/410.
+    """
+    runs = request.app.state.runs
+    current = await asyncio.to_thread(runs.products, run_id)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Run not found.")
+    base = base or await asyncio.to_thread(runs.previous, run_id)
+    previous = await asyncio.to_thread(runs.products, base) if base else []
+    if previous is None:
+        raise HTTPException(status_code=404, detail="Base run not found.")
+    requested, gone = await asyncio.to_thread(runs.scope, run_id)
+    return base, comparable_base(previous, current, requested, gone), current
+
+@app.get("/runs/{run_id}/diff")
+async def run_diff(request: Request, run_id: str, base: Optional[str] = None):
+    """Report added, removed and changed products with their field-level changes."""
+    base, previous, current = await _run_pair(request, run_id, base)
+    return {"run_id": run_id, "base": base, **diff_runs(previous, current)}
+
+@app.post("/crawl", status_code=202)
+async def start_crawl(request: Request):
+    """Discover product URLs from the sitemap or category pages and scrape new or changed ones."""
+    try:
+        payload = await request.json() if await request.body() else {}
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body.")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="JSON body must be an object.")
+
+    category_urls = payload.get("category_urls") or []
+    if not isinstance(category_urls, list) or not all(is_product_url(url) for url in category_urls):
+        raise HTTPException(
+            status_code=400,
+            detail=f"'category_urls' must be a list of URLs starting with '{BASE_URL}'"
+        )
+    # Without category pages the configured sitemap is crawled
+    sitemap_url = payload.get("sitemap_url") or (None if category_urls else config.CRAWL_SITEMAP_URL)
+    try:
+        concurrency = int(payload.get("concurrency") or config.CRAWL_CONCURRENCY)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="'concurrency' must be a number.")
+
+    job = request.app.state.crawler.start(
+        sitemap_url=sitemap_url,
+        category_urls=category_urls,
+        concurrency=min(max(1, concurrency), config.BATCH_MAX_CONCURRENCY),
+        force=_is_true(payload.get("force")),
+    )
+    return job.to_dict()
+
+@app.get("/crawl/{job_id}")
+async def crawl_status(request: Request, job_id: str):
+    """Report discovery and scraping progress of a crawl."""
+    job = request.app.state.crawler.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Crawl job not found.")
+    return job.to_dict()
+
+@app.get("/jobs/stats")
+async def job_stats(request: Request):
+    """Report job queue depth per status and the state of the worker processes."""
+    if not request.app.state.jobs:
+        return {"status": "disabled"}
+    queue = await asyncio.to_thread(request.app.state.jobs.stats)
+    return {"status": "running", "queue": queue, **request.app.state.workers.stats()}
+
+async def _get_job(request: Request, job_id: str) -> Dict:
+    job = None
+    if request.app.state.jobs:
+        job = await asyncio.to_thread(request.app.state.jobs.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scrape job not found.")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def job_status(request: Request, job_id: str):
+    """Report the state of a queued scrape and its result once completed."""
+    return await _job_response(request, await _get_job(request, job_id))
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(request: Request, job_id: str):
+    """Stream the state of a queued scrape as Server-Sent Events until it is finished."""
+    await _get_job(request, job_id)
+
+    async def events():
+        async for job in watch_job(request.app.state.jobs, job_id):
+            if await request.is_disconnected():
+                break
+            if job is None:
+                yield ": keep-alive\n\n"
+                continue
+            data = json.dumps(await _job_response(request, job), ensure_ascii=False)
+            yield f"event: status\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/ready")
+async def ready(request: Request):
+    """Report whether the startup warm-up has finished and the browser pool is warm."""
+    done = request.app.state.warmup.done()
+    body = {
+        "status": "ready" if done else "starting",
+        **request.app.state.readiness,
+        "modules_loaded": {module: module in sys.modules for module in WARMUP_MODULES},
+    }
+    return JSONResponse(body, status_code=200 if done else 503)
+
+@app.get("/pool/stats")
+async def pool_stats(request: Request):
+    """Report browser pool size, lease wait times and recycle counts."""
+    pool = request.app.state.browser_pool
+    if not pool:
+        return {"status": "disabled"}
+    return {"status": "running", **pool.stats()}
+
+@app.get("/cache/stats")
+async def cache_stats(request: Request):
+    """Report product cache hit, miss and stale counters."""
+    cache = request.app.state.scraper.cache
+    if not cache:
+        return {"status": "disabled"}
+    return {"status": "enabled", **cache.stats()}
+
+@app.get("/hosts/stats")
+async def host_stats(request: Request):
+    """Report adaptive concurrency, circuit breaker state and retries per shop host."""
+    return request.app.state.scraper.guard.stats()
+
+@app.get("/metrics")
+async def metrics(request: Request):
+    """Expose scrape pipeline metrics in the Prometheus text format."""
+    pool = request.app.state.browser_pool
+    if pool:
+        for stat, value in pool.stats().items():
+            POOL_GAUGE.set(float(value), stat=stat)
+    cache = request.app.state.scraper.cache
+    if cache:
+        for stat, value in cache.stats().items():
+            CACHE_GAUGE.set(float(value), stat=stat)
+    request.app.state.scraper.guard.export_metrics()
+    if request.app.state.jobs:
+        for stat, value in (await asyncio.to_thread(request.app.state.jobs.stats)).items():
+            JOB_GAUGE.set(float(value), stat=stat)
+        for stat, value in request.app.state.workers.stats().items():
+            JOB_GAUGE.set(float(value), stat=stat)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/download/{format}")
-async def download_file(format: str):
-    """Handle file downloads for XML and CSV formats."""
-    if not SCRAPED_DATA:
+async def download_file(
+    request: Request,
+    format: str,
+    id: str,
+    gzip: bool = False,
+    delta: bool = False,
+    base: Optional[str] = None,
+    plain_text: bool = False,
+    prices: bool = False,
+):
+    """Handle file downloads for XML, CSV and Google feed formats of a product or batch job.
+
+    With ``delta`` a batch run is exported relative to ``base`` (by default
+    the previous run): only new, changed and removed products are written.
+    ``plain_text`` writes the CSV description as text instead of HTML and
+    ``prices`` adds the price columns to the CSV.
+    """
+    if delta:
+        return await _download_delta(request, format, id, base, gzip, plain_text, prices)
+    products = await asyncio.to_thread(request.app.state.results.get, id)
+    if not products:
         raise HTTPException(
             status_code=404, 
-            detail="No scraped data available. Please scrape a product first."
+            detail="No scraped data available for this id. Please scrape the product first."
         )
     
+    if format == "feed":
+        return StreamingResponse(
+            timed_stream(exporters.GoogleFeedExporter.generate_feed(products), "feed"),
+            media_type="application/rss+xml",
+            headers={'Content-Disposition': f'attachment; filename="feed_{id}.xml"'}
+        )
+    if format == "csv":
+        headers = {'Content-Disposition': f'attachment; filename="products_{id}.csv"'}
+        if gzip:
+            headers['Content-Encoding'] = 'gzip'
+        return StreamingResponse(
+            timed_stream(
+                exporters.CSVExporter.stream_csv(products, compress=gzip, plain_text=plain_text, prices=prices),
+                "csv",
+            ),
+            media_type="text/csv",
+            headers=headers
+        )
+    if len(products) > 1:
+        raise HTTPException(
+            status_code=400,
+            detail="This format supports a single product only. Use 'csv' or 'feed' for several products."
+        )
+    product_data = products[0]
+    
     try:
-        filename = f"product_{SCRAPED_DATA.get('artikelnummer', 'export')}"
+        filename = f"product_{product_data.get('artikelnummer', 'export')}"
         
         if format == "xml":
-            content = XMLExporter.generate_xml(SCRAPED_DATA)
+            with timed_export("xml"):
+                content = exporters.XMLExporter.generate_xml(product_data)
             media_type = "application/xml"
             filename = f"{filename}.xml"
-        elif format == "csv":
-            content = CSVExporter.generate_csv(SCRAPED_DATA)
-            media_type = "text/csv"
-            filename = f"{filename}.csv"
         else:
             raise HTTPException(
                 status_code=400,
-                detail="Invalid format specified. Use 'xml' or 'csv'."
+                detail="Invalid format specified. Use 'xml', 'csv' or 'feed'."
             )
         
         headers = {
@@ -122,6 +566,8 @@ async def download_file(format: str):
             headers=headers
         )
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating {format} file: {str(e)}")
         raise HTTPException(
@@ -129,6 +575,51 @@ async def download_file(format: str):
             detail=f"Error generating {format} file: {str(e)}"
         )
 
+async def _download_delta(
+    request: Request,
+    format: str,
+    run_id: str,
+    base: Optional[str],
+    gzip: bool,
+    plain_text: bool,
+    prices: bool,
+):
+    base, previous, current = await _run_pair(request, run_id, base)
+    suffix = f"{run_id}_delta"
+    if format == "csv":
+        headers = {'Content-Disposition': f'attachment; filename="products_{suffix}.csv"'}
+        if gzip:
+            headers['Content-Encoding'] = 'gzip'
+        return StreamingResponse(
+            timed_stream(
+                exporters.CSVExporter.stream_csv(
+                    current, compress=gzip, previous=previous, plain_text=plain_text, prices=prices
+                ),
+                "csv_delta",
+            ),
+            media_type="text/csv",
+            headers=headers
+        )
+    if format == "xml":
+        with timed_export("xml_delta"):
+            content = exporters.XMLExporter.generate_delta_xml(previous, current)
+        return Response(
+            content=content,
+            media_type="application/xml",
+            headers={'Content-Disposition': f'attachment; filename="products_{suffix}.xml"'}
+        )
+    if format == "feed":
+        # A feed has no notion of removed items, it only carries new and changed ones
+        return StreamingResponse(
+            timed_stream(exporters.GoogleFeedExporter.generate_feed(delta_products(previous, current)), "feed_delta"),
+            media_type="application/rss+xml",
+            headers={'Content-Disposition': f'attachment; filename="feed_{suffix}.xml"'}
+        )
+    raise HTTPException(
+        status_code=400,
+        detail="Invalid format specified. Use 'xml', 'csv' or 'feed'."
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
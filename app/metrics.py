@@ -0,0 +1,216 @@
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import threading
+import time
+
+from . import config
+
+try:
+    from opentelemetry import trace as _otel_trace
+except ImportError:  # tracing is optional
+    _otel_trace = None
+
+# Histogram buckets in seconds, from a fast extraction up to the full scrape budget
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets"""
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # Per bucket counts followed by +Inf count and sum
+            series = self._values.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _format_labels(self.labelnames, key, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-2]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+PHASE_SECONDS = REGISTRY.register(Histogram(
+    "scraper_phase_seconds", "Duration of a scrape pipeline phase", ["phase"],
+))
+SCRAPE_SECONDS = REGISTRY.register(Histogram(
+    "scraper_scrape_seconds", "Duration of a complete scrape", ["source"],
+))
+SCRAPES_TOTAL = REGISTRY.register(Counter(
+    "scraper_scrapes_total", "Scrapes by path used and outcome", ["source", "status"],
+))
+EXPORT_SECONDS = REGISTRY.register(Histogram(
+    "scraper_export_seconds", "Duration of generating an export", ["format"],
+))
+POOL_GAUGE = REGISTRY.register(Gauge(
+    "scraper_browser_pool", "Browser pool state and counters", ["stat"],
+))
+CACHE_GAUGE = REGISTRY.register(Gauge(
+    "scraper_cache", "Product cache state and counters", ["stat"],
+))
+RETRIES_TOTAL = REGISTRY.register(Counter(
+    "scraper_retries_total", "Retried scrape attempts by host", ["host"],
+))
+HOST_GAUGE = REGISTRY.register(Gauge(
+    "scraper_host", "Adaptive concurrency and circuit breaker state per host", ["host", "stat"],
+))
+IMAGE_CHECKS_TOTAL = REGISTRY.register(Counter(
+    "scraper_image_checks_total", "Gallery image checks by result (ok, broken, unreachable, cached)", ["result"],
+))
+JOB_GAUGE = REGISTRY.register(Gauge(
+    "scraper_jobs", "Job queue depth and worker processes", ["stat"],
+))
+
+
+def _tracer():
+    if _otel_trace is None or not config.TRACING_ENABLED:
+        return None
+    return _otel_trace.get_tracer("blutsgeschwister-scraper")
+
+
+@contextmanager
+def timed(phase: str, timings: Optional[Dict[str, float]] = None) -> Iterator[None]:
+    """
+    Time a pipeline phase.
+
+    The duration is observed in ``scraper_phase_seconds``, added to
+    ``timings`` in milliseconds when given, and recorded as a trace span when
+    OpenTelemetry is installed and TRACING_ENABLED is set.
+    """
+    tracer = _tracer()
+    span = tracer.start_as_current_span(f"scraper.{phase}") if tracer else nullcontext()
+    started = time.perf_counter()
+    with span:
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            PHASE_SECONDS.observe(elapsed, phase=phase)
+            if timings is not None:
+                timings[phase] = round(timings.get(phase, 0) + elapsed * 1000, 3)
+
+
+@contextmanager
+def timed_export(export_format: str) -> Iterator[None]:
+    """Observe the generation time of an export in ``scraper_export_seconds``"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        EXPORT_SECONDS.observe(time.perf_counter() - started, format=export_format)
+
+
+def timed_stream(chunks: Iterator[bytes], export_format: str) -> Iterator[bytes]:
+    """Pass through a streamed export and observe its total generation time"""
+    elapsed = 0.0
+    iterator = iter(chunks)
+    while True:
+        started = time.perf_counter()
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            break
+        finally:
+            elapsed += time.perf_counter() - started
+        yield chunk
+    EXPORT_SECONDS.observe(elapsed, format=export_format)
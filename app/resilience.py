@@ -0,0 +1,267 @@
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+from urllib.parse import urlsplit
+import asyncio
+import logging
+import random
+import sys
+import time
+
+import httpx
+
+from . import config
+from .metrics import HOST_GAUGE, RETRIES_TOTAL
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Shop answers that mean "try again later"
+RETRYABLE_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class ScrapeError(Exception):
+    """A scrape failure whose message can be shown to the user"""
+    retryable = False
+
+
+class TransientScrapeError(ScrapeError):
+    """Failure that may succeed on a later attempt (timeouts, 429/5xx, crashed pages)"""
+    retryable = True
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ProductGoneError(ScrapeError):
+    """The product page answered 404 or 410"""
+
+    def __init__(self, message: str = "Die Produktseite wurde nicht gefunden."):
+        super().__init__(message)
+
+
+class CircuitOpenError(ScrapeError):
+    """The host failed too often recently and is not contacted for now"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header; HTTP dates are ignored"""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Classify an exception raised by the HTTP fast path or the browser"""
+    if isinstance(error, ScrapeError):
+        return error.retryable
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    if isinstance(error, (httpx.TimeoutException, httpx.TransportError)):
+        return True
+    # Navigation timeouts, crashed pages and closed targets. Without a loaded
+    # Playwright the error cannot come from the browser, so it is not imported here
+    playwright = sys.modules.get("playwright.async_api")
+    return playwright is not None and isinstance(error, playwright.Error)
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    if isinstance(error, TransientScrapeError):
+        return error.retry_after
+    if isinstance(error, httpx.HTTPStatusError):
+        return parse_retry_after(error.response.headers.get("retry-after"))
+    return None
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+
+    def __init__(
+        self,
+        attempts: int = config.RETRY_ATTEMPTS,
+        base_delay: float = config.RETRY_BASE_DELAY,
+        max_delay: float = config.RETRY_MAX_DELAY,
+    ):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number ``attempt`` (starting at 1)"""
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            return min(self.max_delay, max(backoff, retry_after))
+        return backoff
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that follows the host's health (AIMD).
+
+    Every fast success raises the limit by ``1 / limit``, so it grows by about
+    one per round of requests; an overload signal or a slow response halves it.
+    """
+
+    def __init__(
+        self,
+        initial: int = config.HOST_CONCURRENCY_INITIAL,
+        maximum: int = config.HOST_CONCURRENCY_MAX,
+        latency_target: float = config.HOST_LATENCY_TARGET,
+    ):
+        self.maximum = max(1, maximum)
+        self.limit = float(min(max(1, initial), self.maximum))
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self._changed = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency: Optional[float] = None, overloaded: bool = False):
+        async with self._changed:
+            self.in_flight -= 1
+            if overloaded or (latency is not None and latency > self.latency_target):
+                self.limit = max(1.0, self.limit / 2)
+            elif latency is not None:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self._changed.notify_all()
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a host after ``failure_threshold`` consecutive failures.
+
+    After ``reset_timeout`` seconds one trial call is let through (half open);
+    its outcome closes the circuit again or keeps it open for another period.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = config.BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = config.BREAKER_RESET_TIMEOUT,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may be made now"""
+        if self.state == "closed":
+            return
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return
+        raise CircuitOpenError(
+            "Der Shop ist momentan nicht erreichbar. Bitte versuchen Sie es später erneut."
+        )
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"Circuit opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+    def release_trial(self):
+        """End a trial call that neither succeeded nor failed transiently"""
+        self._trial_running = False
+
+
+class _Host:
+    def __init__(self):
+        self.limiter = AdaptiveLimiter()
+        self.breaker = CircuitBreaker()
+        self.retries = 0
+
+
+class HostGuard:
+    """
+    Runs scrape attempts per host with the adaptive limiter, the circuit
+    breaker and retries of transient failures.
+    """
+
+    def __init__(self, policy: Optional[RetryPolicy] = None):
+        self.policy = policy or RetryPolicy()
+        self._hosts: Dict[str, _Host] = {}
+
+    def _host(self, url: str) -> _Host:
+        name = urlsplit(url).netloc
+        if name not in self._hosts:
+            self._hosts[name] = _Host()
+        return self._hosts[name]
+
+    async def call(self, url: str, attempt: Callable[[], Awaitable[T]], attempts: Optional[int] = None) -> T:
+        """
+        Run ``attempt`` until it succeeds, fails permanently or runs out of
+        attempts; the last error is raised.
+        """
+        host = self._host(url)
+        attempts = attempts or self.policy.attempts
+        for number in range(1, attempts + 1):
+            host.breaker.before_call()
+            try:
+                await host.limiter.acquire()
+            except BaseException:
+                # Cancelled while waiting for a slot, give up the trial call
+                host.breaker.release_trial()
+                raise
+            started = time.perf_counter()
+            try:
+                result = await attempt()
+            except Exception as e:
+                retryable = is_retryable(e)
+                await host.limiter.release(overloaded=retryable)
+                if not retryable:
+                    host.breaker.release_trial()
+                    raise
+                host.breaker.record_failure()
+                if number == attempts or host.breaker.state == "open":
+                    raise
+                delay = self.policy.delay(number, _retry_after(e))
+                host.retries += 1
+                RETRIES_TOTAL.inc(host=urlsplit(url).netloc)
+                logger.warning(f"Attempt {number} for {url} failed, retrying in {delay:.1f}s: {str(e)}")
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancelled, e.g. by the overall scrape budget
+                await host.limiter.release()
+                host.breaker.release_trial()
+                raise
+            else:
+                await host.limiter.release(latency=time.perf_counter() - started)
+                host.breaker.record_success()
+                return result
+
+    def stats(self) -> Dict[str, Dict]:
+        """Concurrency limit, breaker state and retry count per host"""
+        return {
+            name: {
+                "concurrency_limit": round(host.limiter.limit, 2),
+                "in_flight": host.limiter.in_flight,
+                "circuit": host.breaker.state,
+                "consecutive_failures": host.breaker.failures,
+                "retries": host.retries,
+            }
+            for name, host in self._hosts.items()
+        }
+
+    def export_metrics(self):
+        for name, stats in self.stats().items():
+            HOST_GAUGE.set(stats["concurrency_limit"], host=name, stat="concurrency_limit")
+            HOST_GAUGE.set(stats["in_flight"], host=name, stat="in_flight")
+            HOST_GAUGE.set(1.0 if stats["circuit"] != "closed" else 0.0, host=name, stat="circuit_open")
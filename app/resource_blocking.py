@@ -0,0 +1,129 @@
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+import logging
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+LOAD_MODES = ("fast", "full")
+
+# Resource types that are never needed to read the product data
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+
+# Third-party tracking and analytics hosts (subdomains are matched as well)
+TRACKING_DOMAINS = frozenset({
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "hotjar.io",
+    "criteo.com",
+    "criteo.net",
+    "pinterest.com",
+    "pinimg.com",
+    "tiktok.com",
+    "bing.com",
+    "clarity.ms",
+    "trustedshops.com",
+    "usercentrics.eu",
+    "cookiebot.com",
+    "newrelic.com",
+    "nr-data.net",
+    "sentry.io",
+})
+
+
+class LoadOptions:
+    """How a product page is loaded: navigation mode and what gets blocked"""
+
+    def __init__(
+        self,
+        mode: str = config.SCRAPE_LOAD_MODE,
+        blocked_domains: Optional[Iterable[str]] = None,
+        blocked_types: Optional[Iterable[str]] = None,
+    ):
+        if mode not in LOAD_MODES:
+            raise ValueError(f"Unknown load mode '{mode}'. Use one of: {', '.join(LOAD_MODES)}")
+        self.mode = mode
+        self.blocked_domains = frozenset(
+            d.strip().lower().lstrip(".") for d in (blocked_domains if blocked_domains is not None else TRACKING_DOMAINS)
+            if d.strip()
+        )
+        self.blocked_types = frozenset(blocked_types if blocked_types is not None else BLOCKED_RESOURCE_TYPES)
+
+    @classmethod
+    def from_params(cls, mode: Optional[str] = None, blocklist=None) -> "LoadOptions":
+        """
+        Build options from request parameters.
+
+        ``blocklist`` is a list or a comma separated string of extra domains
+        blocked on top of the default tracking domains.
+        """
+        domains = set(TRACKING_DOMAINS)
+        if isinstance(blocklist, str):
+            blocklist = blocklist.split(",")
+        if blocklist:
+            domains.update(str(d) for d in blocklist)
+        return cls(mode=mode or config.SCRAPE_LOAD_MODE, blocked_domains=domains)
+
+    @property
+    def fast(self) -> bool:
+        return self.mode == "fast"
+
+    @property
+    def wait_until(self) -> str:
+        # The product selector wait covers everything the fast mode skips
+        return "domcontentloaded" if self.fast else "networkidle"
+
+    def is_blocked_host(self, host: str) -> bool:
+        host = host.lower()
+        return any(host == d or host.endswith("." + d) for d in self.blocked_domains)
+
+
+class RequestBlocker:
+    """Aborts unneeded requests of a page and counts what was blocked"""
+
+    def __init__(self, options: LoadOptions):
+        self.options = options
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_by_type: Dict[str, int] = {}
+
+    async def install(self, page):
+        """Route all requests of ``page`` through the blocker"""
+        if self.options.fast:
+            await page.route("**/*", self._handle)
+        else:
+            # Nothing is blocked, only count requests for comparison
+            page.on("request", self._count)
+
+    def _count(self, request):
+        self.allowed += 1
+
+    async def _handle(self, route):
+        request = route.request
+        resource_type = request.resource_type
+        if resource_type in self.options.blocked_types:
+            reason = resource_type
+        elif self.options.is_blocked_host(urlsplit(request.url).hostname or ""):
+            reason = "tracking"
+        else:
+            self.allowed += 1
+            await route.continue_()
+            return
+
+        self.blocked += 1
+        self.blocked_by_type[reason] = self.blocked_by_type.get(reason, 0) + 1
+        await route.abort()
+
+    def stats(self) -> Dict:
+        return {
+            "mode": self.options.mode,
+            "requests_allowed": self.allowed,
+            "requests_blocked": self.blocked,
+            "blocked_by_type": dict(self.blocked_by_type),
+        }
@@ -0,0 +1,128 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import threading
+import time
+
+from . import config, db
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStore(ABC):
+    """
+    Stores scraped products for later download.
+
+    Every entry is a list of product dicts addressed by a product id (one
+    product) or a batch job id (all products of the job). Entries expire
+    after ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl: float = config.RESULT_TTL, max_entries: int = config.RESULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+
+    @abstractmethod
+    def put(self, key: str, products: List[Dict]):
+        """Store ``products`` under ``key``"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Products stored under ``key``, or None when missing or expired"""
+
+    def close(self):
+        pass
+
+
+class MemoryResultStore(ResultStore):
+    """In-process LRU result store, only visible to the worker that scraped"""
+
+    def __init__(self, ttl: float = config.RESULT_TTL, max_entries: int = config.RESULT_MAX_ENTRIES):
+        super().__init__(ttl, max_entries)
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict]]]" = OrderedDict()
+        # Routes call the store through asyncio.to_thread
+        self._lock = threading.Lock()
+
+    def put(self, key: str, products: List[Dict]):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, products)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, products = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return products
+
+
+class SQLiteResultStore(ResultStore):
+    """Result store in a SQLite file that several uvicorn workers can share"""
+
+    def __init__(
+        self,
+        path: str = config.RESULT_STORE_PATH,
+        ttl: float = config.RESULT_TTL,
+        max_entries: int = config.RESULT_MAX_ENTRIES,
+    ):
+        super().__init__(ttl, max_entries)
+        self._lock = threading.Lock()
+        self._db = db.connect(path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                products TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def put(self, key: str, products: List[Dict]):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, products, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(products, ensure_ascii=False), now + self.ttl, now),
+            )
+            self._db.execute("DELETE FROM results WHERE expires_at < ?", (now,))
+            self._db.execute(
+                "DELETE FROM results WHERE key IN ("
+                "SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT products FROM results WHERE key = ? AND expires_at >= ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return json.loads(row[0])
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def create_result_store(backend: str = config.RESULT_STORE_BACKEND) -> ResultStore:
+    """Create the result store configured by RESULT_STORE_BACKEND"""
+    if backend == "sqlite":
+        return SQLiteResultStore()
+    if backend != "memory":
+        logger.warning(f"Unknown result store backend '{backend}', using memory")
+    return MemoryResultStore()
@@ -0,0 +1,119 @@
+from html import escape
+from selectolax.parser import HTMLParser
+from typing import Dict, FrozenSet, List
+import re
+
+# Tags kept in product details; everything else is unwrapped to its text
+ALLOWED_TAGS = frozenset({
+    "a", "b", "blockquote", "br", "dd", "div", "dl", "dt", "em", "h1", "h2", "h3",
+    "h4", "h5", "h6", "hr", "i", "li", "ol", "p", "span", "strong", "sub", "sup",
+    "table", "tbody", "td", "th", "thead", "tr", "u", "ul",
+})
+
+ALLOWED_ATTRIBUTES: Dict[str, FrozenSet[str]] = {
+    "a": frozenset({"href", "title"}),
+    "td": frozenset({"colspan", "rowspan"}),
+    "th": frozenset({"colspan", "rowspan"}),
+}
+
+# Tags dropped together with their content ("_comment" is how lexbor names comments)
+DROPPED_TAGS = frozenset({
+    "_comment", "iframe", "noscript", "object", "script", "style", "svg", "template",
+})
+
+VOID_TAGS = frozenset({"br", "hr"})
+
+# Tags that start a new line in the plain text variant
+BLOCK_TAGS = frozenset({
+    "blockquote", "br", "dd", "div", "dl", "dt", "h1", "h2", "h3", "h4", "h5", "h6",
+    "hr", "li", "ol", "p", "table", "tr", "ul",
+})
+
+# Table cells are separated by a space in the plain text variant
+CELL_TAGS = frozenset({"td", "th"})
+
+SAFE_URL = re.compile(r"^(https?:|mailto:|/|#|[^:]*$)", re.IGNORECASE)
+# HTML whitespace only, so non-breaking spaces survive as &nbsp;
+WHITESPACE = re.compile(r"[ \t\n\r\f]+")
+LINE_WHITESPACE = re.compile(r"[ \t\r\f\xa0]+")
+
+
+# Start tags of allowed tags without allowed attributes, built once
+PLAIN_START_TAGS = {tag: f"<{tag}>" for tag in ALLOWED_TAGS - set(ALLOWED_ATTRIBUTES)}
+END_TAGS = {tag: f"</{tag}>" for tag in ALLOWED_TAGS}
+
+
+def _start_tag(node) -> str:
+    allowed = ALLOWED_ATTRIBUTES[node.tag]
+    rendered = "".join(
+        f' {name}="{escape((value or "").strip())}"'
+        for name, value in node.attributes.items()
+        if name in allowed and (name != "href" or SAFE_URL.match((value or "").strip()))
+    )
+    return f"<{node.tag}{rendered}>"
+
+
+def _walk(html: str, text_only: bool) -> List[str]:
+    """
+    Allowed markup (or plain text) of ``html`` in document order.
+
+    The fragment is parsed once by lexbor, which closes unclosed tags and
+    comments the way a browser does, and walked with an explicit stack so
+    deeply nested input cannot exhaust the recursion limit.
+    """
+    body = HTMLParser(html).body
+    if body is None:
+        return []
+    parts: List[str] = []
+    # Nodes still to visit and literal strings (end tags, line breaks), last one first
+    stack: list = list(body.iter(include_text=True))[::-1]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+            continue
+        tag = item.tag
+        if tag == "-text":
+            text = item.text_content
+            if not text_only and ("&" in text or "<" in text or ">" in text or "\xa0" in text):
+                text = escape(text, quote=False).replace("\xa0", "&nbsp;")
+            parts.append(text)
+            continue
+        if tag in DROPPED_TAGS:
+            continue
+        if text_only:
+            if tag in BLOCK_TAGS:
+                parts.append("\n- " if tag == "li" else "\n")
+                stack.append("\n")
+            elif tag in CELL_TAGS:
+                parts.append(" ")
+        elif tag in ALLOWED_TAGS:
+            parts.append(PLAIN_START_TAGS.get(tag) or _start_tag(item))
+            if tag in VOID_TAGS:
+                continue
+            stack.append(END_TAGS[tag])
+        children = list(item.iter(include_text=True))
+        children.reverse()
+        stack.extend(children)
+    return parts
+
+
+def sanitize_html(html: str) -> str:
+    """
+    Keep only allowed tags and attributes of product details HTML.
+
+    Scripts, styles and comments are removed with their content, other tags
+    are unwrapped, unclosed tags are closed and whitespace runs collapse to a
+    single space.
+    """
+    if not html:
+        return ""
+    return WHITESPACE.sub(" ", "".join(_walk(html, text_only=False))).strip()
+
+
+def html_to_text(html: str) -> str:
+    """Plain text of product details with one line per block and "- " for list items"""
+    if not html:
+        return ""
+    lines = LINE_WHITESPACE.sub(" ", "".join(_walk(html, text_only=True))).split("\n")
+    return "\n".join(line.strip() for line in lines if line.strip() not in ("", "-"))
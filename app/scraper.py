@@ -1,71 +1,104 @@
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
 from typing import Dict, List, Optional
-import re
 import logging
 import json
 import asyncio
 
+from .browser_pool import BrowserPool, CONTEXT_OPTIONS, PAGE_DEFAULT_TIMEOUT, launch_browser, playwright_api
+from .categories import get_category_mapper
+from .extraction import extract_fields
+from .metrics import timed
+from .resilience import RETRYABLE_STATUS_CODES, ProductGoneError, ScrapeError, TransientScrapeError, parse_retry_after
+from .resource_blocking import LoadOptions, RequestBlocker
+from .sanitizer import sanitize_html
+from .variants import parse_variants
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+BASE_URL = "https://www.blutsgeschwister.de/de"
+
+
+def is_product_url(url: Optional[str]) -> bool:
+    """Check that a URL points into the Blutsgeschwister shop"""
+    return bool(url) and url.startswith(BASE_URL)
+
 class ProductScraper:
-    def __init__(self):
+    def __init__(self, pool: Optional[BrowserPool] = None):
+        self.pool = pool
+        self.playwright = None
         self.browser = None
         self.context = None
         self.page = None
+        self._lease = None
+        self.extraction_errors: Dict[str, str] = {}
+        self.timings: Dict[str, float] = {}
+        self.report: Dict = {"timings": self.timings}
 
     async def __aenter__(self):
+        if self.pool:
+            self._lease = self.pool.lease()
+            with timed("lease", self.timings):
+                self.page = await self._lease.__aenter__()
+            return self
         try:
             logger.info("Starting Playwright and launching browser...")
-            playwright = await async_playwright().start()
-            self.browser = await playwright.chromium.launch(
-                headless=True,  # Run in headless mode
-                args=[
-                    '--disable-gpu',
-                    '--disable-dev-shm-usage',
-                    '--disable-setuid-sandbox',
-                    '--no-sandbox',
-                    '--no-zygote',
-                ],
-                timeout=120000,  # 120 second timeout for browser launch
-            )
-            self.context = await self.browser.new_context(
-                viewport={'width': 1280, 'height': 800},
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            )
-            self.page = await self.context.new_page()
-            await self.page.set_default_timeout(60000)  # 60 second timeout for all page operations
+            with timed("browser_start", self.timings):
+                self.playwright = await playwright_api().async_playwright().start()
+                self.browser = await launch_browser(self.playwright)
+            with timed("context_create", self.timings):
+                self.context = await self.browser.new_context(**CONTEXT_OPTIONS)
+                self.page = await self.context.new_page()
+            self.page.set_default_timeout(PAGE_DEFAULT_TIMEOUT)
             logger.info("Browser and page setup complete")
             return self
         except Exception as e:
             logger.error(f"Error during browser setup: {str(e)}")
-            if self.browser:
-                await self.browser.close()
-            raise
+            await self._close_browser()
+            # A browser that cannot start is not the shop's fault and is not retried
+            raise ScrapeError(f"Der Browser konnte nicht gestartet werden: {str(e)}") from e
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._lease:
+            lease, self._lease = self._lease, None
+            return await lease.__aexit__(exc_type, exc_val, exc_tb)
+        await self._close_browser()
+
+    async def _close_browser(self):
         try:
             if self.browser:
                 await self.browser.close()
                 logger.info("Browser closed successfully")
+            if self.playwright:
+                await self.playwright.stop()
         except Exception as e:
             logger.error(f"Error closing browser: {str(e)}")
 
-    async def scrape_product(self, url: str) -> Dict:
+    async def scrape_product(self, url: str, load_options: Optional[LoadOptions] = None) -> Dict:
         """
         Scrape product data from a Blutsgeschwister product page
         """
+        load_options = load_options or LoadOptions()
+        blocker = RequestBlocker(load_options)
         try:
             logger.info(f"Starting to scrape URL: {url}")
-            
+            await blocker.install(self.page)
+
             # Navigate to the page with a timeout
             try:
-                logger.info("Navigating to product page...")
-                await self.page.goto(url, wait_until="networkidle", timeout=60000)  # 60 second timeout
+                logger.info(f"Navigating to product page ({load_options.mode} mode)...")
+                with timed("goto", self.timings):
+                    response = await self.page.goto(url, wait_until=load_options.wait_until, timeout=60000)  # 60 second timeout
+                if response is not None and response.status in (404, 410):
+                    raise ProductGoneError()
+                if response is not None and response.status in RETRYABLE_STATUS_CODES:
+                    raise TransientScrapeError(
+                        "Die Seite konnte nicht geladen werden. Bitte versuchen Sie es später erneut.",
+                        retry_after=parse_retry_after(response.headers.get("retry-after")),
+                    )
                 logger.info("Page loaded successfully")
-            except PlaywrightTimeout:
+            except playwright_api().TimeoutError as e:
                 logger.error("Timeout while loading the page")
-                raise Exception("Die Seite konnte nicht geladen werden. Bitte versuchen Sie es später erneut.")
+                raise TransientScrapeError("Die Seite konnte nicht geladen werden. Bitte versuchen Sie es später erneut.") from e
             except Exception as e:
                 logger.error(f"Error during page navigation: {str(e)}")
                 raise
@@ -73,26 +106,22 @@ class ProductScraper:
             # Wait for critical elements
             try:
                 logger.info("Waiting for product data to load...")
-                await self.page.wait_for_selector('[data-product-id]', timeout=30000)  # 30 second timeout
+                with timed("selector_wait", self.timings):
+                    await self.page.wait_for_selector('[data-product-id]', timeout=30000)  # 30 second timeout
                 logger.info("Product data found on page")
-            except PlaywrightTimeout:
+            except playwright_api().TimeoutError:
                 logger.error("Product data not found on page")
-                raise Exception("Keine Produktdaten auf der Seite gefunden.")
+                raise ScrapeError("Keine Produktdaten auf der Seite gefunden.")
             except Exception as e:
                 logger.error(f"Error waiting for product data: {str(e)}")
                 raise
 
-            # Extract all required product data
-            product_data = {
-                "artikelnummer": await self._get_article_number(),
-                "name": await self._get_product_name(),
-                "groessen": await self._get_sizes(),
-                "bilder": await self._get_images(),
-                "passform": await self._get_fit_description(),
-                "details": await self._get_details(),
-                "kategorie": await self._get_category(),
-                "metafields": await self._get_metafields()
-            }
+            # Extract all required product data in a single page round trip
+            with timed("extract", self.timings):
+                extracted = await extract_fields(self.page)
+            self.extraction_errors = extracted["errors"]
+            with timed("build", self.timings):
+                product_data = self.build_product(extracted["values"], url)
 
             # Log extracted data summary
             logger.info(f"Extracted data summary: Article #{product_data['artikelnummer']}, "
@@ -101,11 +130,7 @@ class ProductScraper:
                        f"Images count: {len(product_data['bilder'])}")
 
             # Validate the extracted data
-            if not product_data["artikelnummer"]:
-                raise Exception("Artikelnummer konnte nicht gefunden werden.")
-            
-            if not product_data["name"]:
-                raise Exception("Produktname konnte nicht gefunden werden.")
+            self.validate_product(product_data)
 
             logger.info("Successfully scraped product data")
             return product_data
@@ -113,165 +138,61 @@ class ProductScraper:
         except Exception as e:
             logger.error(f"Error scraping product: {str(e)}")
             raise
-
-    async def _get_article_number(self) -> str:
-        """Extract article number"""
-        try:
-            article_number = await self.page.evaluate("""
-                () => {
-                    const element = document.querySelector('[data-product-id]');
-                    return element ? element.getAttribute('data-product-id') : '';
-                }
-            """)
-            logger.info(f"Found article number: {article_number}")
-            return article_number or ""
-        except Exception as e:
-            logger.error(f"Error extracting article number: {str(e)}")
-            return ""
-
-    async def _get_product_name(self) -> str:
-        """Extract product name"""
-        try:
-            name = await self.page.evaluate("""
-                () => {
-                    const element = document.querySelector('h1.product-title');
-                    return element ? element.textContent.trim() : '';
-                }
-            """)
-            logger.info(f"Found product name: {name}")
-            return name or ""
-        except Exception as e:
-            logger.error(f"Error extracting product name: {str(e)}")
-            return ""
-
-    async def _get_sizes(self) -> List[str]:
-        """Extract available sizes"""
-        try:
-            sizes = await self.page.evaluate("""
-                () => {
-                    const sizeElements = document.querySelectorAll('.size-selector option:not([disabled])');
-                    return Array.from(sizeElements)
-                        .map(el => el.textContent.trim())
-                        .filter(size => size && size !== 'Größe wählen');
-                }
-            """)
-            logger.info(f"Found sizes: {sizes}")
-            return sizes or []
-        except Exception as e:
-            logger.error(f"Error extracting sizes: {str(e)}")
-            return []
-
-    async def _get_images(self) -> List[str]:
-        """Extract product images"""
-        try:
-            images = await self.page.evaluate("""
-                () => {
-                    const images = document.querySelectorAll('.product-gallery img[src]');
-                    return Array.from(images)
-                        .map(img => img.src)
-                        .filter(src => src && src.startsWith('http'));
-                }
-            """)
-            logger.info(f"Found {len(images)} images")
-            return images or []
-        except Exception as e:
-            logger.error(f"Error extracting images: {str(e)}")
-            return []
-
-    async def _get_fit_description(self) -> str:
-        """Extract fit description"""
-        try:
-            fit = await self.page.evaluate("""
-                () => {
-                    const element = document.querySelector('.product-fit-description, .product-description');
-                    return element ? element.textContent.trim() : '';
-                }
-            """)
-            logger.info(f"Found fit description: {bool(fit)}")
-            return fit or ""
-        except Exception as e:
-            logger.error(f"Error extracting fit description: {str(e)}")
-            return ""
-
-    async def _get_details(self) -> str:
-        """Extract product details including care instructions and materials"""
-        try:
-            details = await self.page.evaluate("""
-                () => {
-                    const detailsSection = document.querySelector('.product-details, .product-information');
-                    return detailsSection ? detailsSection.innerHTML.trim() : '';
-                }
-            """)
-            logger.info(f"Found details: {bool(details)}")
-            return self._clean_html(details) if details else ""
-        except Exception as e:
-            logger.error(f"Error extracting details: {str(e)}")
-            return ""
-
-    async def _get_category(self) -> str:
-        """Extract product category"""
-        try:
-            category = await self.page.evaluate("""
-                () => {
-                    const breadcrumbs = document.querySelector('.breadcrumb');
-                    if (!breadcrumbs) return '';
-                    const links = Array.from(breadcrumbs.querySelectorAll('a'));
-                    return links
-                        .map(a => a.textContent.trim())
-                        .filter(text => text && text !== 'Home')
-                        .join(' > ');
-                }
-            """)
-            logger.info(f"Found category: {category}")
-            return category or ""
-        except Exception as e:
-            logger.error(f"Error extracting category: {str(e)}")
-            return ""
-
-    async def _get_metafields(self) -> Dict:
+        finally:
+            self.report["load"] = blocker.stats()
+
+    @classmethod
+    def build_product(cls, values: Dict, url: str = "") -> Dict:
+        """Assemble the product dict from the extracted field values"""
+        details = values.get("details", "")
+        category = values.get("kategorie", "")
+        variants = parse_variants(values.get("produkt_json", []), values.get("groessen", []))
+        # Sizes from the variant data when the size selector is missing
+        sizes = values.get("groessen", []) or [variant.size for variant in variants if variant.available]
+        product_data = {
+            "artikelnummer": values.get("artikelnummer", ""),
+            "name": values.get("name", ""),
+            "groessen": sizes,
+            "bilder": values.get("bilder", []),
+            "passform": values.get("passform", ""),
+            "details": cls._clean_html(details) if details else "",
+            "kategorie": category,
+            "metafields": cls._build_metafields(category, sizes),
+            "url": url,
+        }
+        if variants:
+            product_data["varianten"] = [variant.to_dict() for variant in variants]
+        return product_data
+
+    @staticmethod
+    def validate_product(product_data: Dict):
+        """Raise if the fields every export needs are missing"""
+        if not product_data["artikelnummer"]:
+            raise Exception("Artikelnummer konnte nicht gefunden werden.")
+
+        if not product_data["name"]:
+            raise Exception("Produktname konnte nicht gefunden werden.")
+
+    @classmethod
+    def _build_metafields(cls, category: str, sizes: List[str]) -> Dict:
         """Get metafields with dynamic category mapping"""
-        try:
-            category = await self._get_category()
-            sizes = await self._get_sizes()
-            
-            metafields = {
-                "meta_google:age_group": "Erwachsener",
-                "meta_google:brand": "Blutsgeschwister",
-                "meta_google:condition": "New",
-                "meta_google:gender": "Female",
-                "meta_google:google_product_category": self._map_category_to_google(category),
-                "meta_google:size": ", ".join(sizes) if sizes else "",
-                "meta_google:google_product_type": category.split(" > ")[-1] if category else "",
-                "meta_google:tags": ""
-            }
-            logger.info("Generated metafields")
-            return metafields
-        except Exception as e:
-            logger.error(f"Error generating metafields: {str(e)}")
-            return {}
-
-    def _map_category_to_google(self, category: str) -> str:
+        return {
+            "meta_google:age_group": "Erwachsener",
+            "meta_google:brand": "Blutsgeschwister",
+            "meta_google:condition": "New",
+            "meta_google:gender": "Female",
+            "meta_google:google_product_category": cls._map_category_to_google(category),
+            "meta_google:size": ", ".join(sizes) if sizes else "",
+            "meta_google:google_product_type": category.split(" > ")[-1] if category else "",
+            "meta_google:tags": ""
+        }
+
+    @staticmethod
+    def _map_category_to_google(category: str) -> str:
         """Map Blutsgeschwister category to Google category"""
-        category_lower = category.lower()
-        
-        if "kleider" in category_lower:
-            return "Apparel & Accessories > Clothing > Dresses"
-        elif "hosen" in category_lower:
-            return "Apparel & Accessories > Clothing > Pants"
-        elif "jacken" in category_lower:
-            return "Apparel & Accessories > Clothing > Jackets"
-        else:
-            return "Apparel & Accessories > Clothing"
+        return get_category_mapper().classify(category or "")
 
-    def _clean_html(self, html: str) -> str:
+    @staticmethod
+    def _clean_html(html: str) -> str:
         """Clean HTML content"""
-        if not html:
-            return ""
-        # Remove script and style elements
-        html = re.sub(r'<script[^>]*>.*?</script>', '', html, flags=re.DOTALL)
-        html = re.sub(r'<style[^>]*>.*?</style>', '', html, flags=re.DOTALL)
-        # Remove HTML comments
-        html = re.sub(r'<!--.*?-->', '', html, flags=re.DOTALL)
-        # Remove extra whitespace
-        html = re.sub(r'\s+', ' ', html).strip()
-        return html
+        return sanitize_html(html)
@@ -0,0 +1,186 @@
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import time
+
+import httpx
+
+from . import config
+from .browser_pool import BrowserPool
+from .cache import CacheEntry, ProductCache
+from .changes import product_fingerprint
+from .http_fetcher import HTTPProductFetcher, diff_products
+from .images import ImagePipeline
+from .metrics import SCRAPE_SECONDS, SCRAPES_TOTAL, timed
+from .resilience import CircuitOpenError, HostGuard, ProductGoneError
+from .resource_blocking import LoadOptions
+from .scraper import ProductScraper
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeService:
+    """
+    Scrapes a product URL with the cheapest path that yields valid data.
+
+    Fresh cache entries are served first, then the HTTP fast path is tried;
+    the browser is only used when the server-rendered page does not contain
+    a valid product. Requests to the shop go through a HostGuard that retries
+    transient browser failures and stops calling a host that keeps failing.
+    With an ImagePipeline the gallery images are de-duplicated and checked.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[BrowserPool] = None,
+        fetcher: Optional[HTTPProductFetcher] = None,
+        cache: Optional[ProductCache] = None,
+        verify_fast_path: bool = config.HTTP_VERIFY,
+        guard: Optional[HostGuard] = None,
+        images: Optional[ImagePipeline] = None,
+    ):
+        self.pool = pool
+        self.fetcher = fetcher
+        self.cache = cache
+        self.verify_fast_path = verify_fast_path
+        self.guard = guard or HostGuard()
+        self.images = images
+        # Background start of the browser pool; browser scrapes wait for it
+        self.warmup: Optional[asyncio.Task] = None
+
+    async def scrape(
+        self,
+        url: str,
+        load_options: Optional[LoadOptions] = None,
+        force: bool = False,
+    ) -> Tuple[Dict, Dict]:
+        """
+        Scrape a single URL within the configured time budget.
+
+        Cached products are served while fresh and revalidated with their
+        ETag/Last-Modified once stale; ``force`` bypasses the cache lookup.
+        Returns the product data and a report describing how it was scraped,
+        including per-phase timings in milliseconds and the product's content
+        fingerprint.
+        """
+        timings: Dict[str, float] = {}
+        report: Dict = {"source": "browser", "timings": timings}
+        status = "error"
+        started = time.perf_counter()
+        try:
+            async with asyncio.timeout(config.SCRAPE_TIMEOUT):
+                product_data = await self._scrape(url, load_options, force, report)
+                if self.images:
+                    with timed("images", timings):
+                        product_data = await self.images.apply(product_data, report)
+            report["fingerprint"] = product_fingerprint(product_data)
+            status = "success"
+            return product_data, report
+        except asyncio.TimeoutError:
+            status = "timeout"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            timings["total"] = round(elapsed * 1000, 3)
+            SCRAPE_SECONDS.observe(elapsed, source=report["source"])
+            SCRAPES_TOTAL.inc(source=report["source"], status=status)
+
+    async def _scrape(self, url: str, load_options: Optional[LoadOptions], force: bool, report: Dict) -> Dict:
+        timings = report["timings"]
+        entry = await self._cache_lookup(url, force, timings)
+        if entry and entry.is_fresh(self.cache.ttl):
+            report["source"] = "cache"
+            return entry.data
+
+        if self.fetcher:
+            result = await self._scrape_http(url, entry, timings)
+            if result:
+                product_data, report["source"] = result
+                if self.verify_fast_path and report["source"] == "http":
+                    await self._verify(url, product_data, load_options)
+                return product_data
+
+        report["source"] = "browser"
+        product_data, browser_report = await self._scrape_browser(url, load_options)
+        timings.update(browser_report.pop("timings", {}))
+        report.update(browser_report)
+        await self._cache_store(url, product_data)
+        return product_data
+
+    async def _cache_lookup(self, url: str, force: bool, timings: Dict[str, float]) -> Optional[CacheEntry]:
+        if not self.cache:
+            return None
+        if force:
+            self.cache.record("bypassed")
+            return None
+        with timed("cache_lookup", timings):
+            entry = await asyncio.to_thread(self.cache.get, url)
+        if entry is None:
+            self.cache.record("misses")
+        elif entry.is_fresh(self.cache.ttl):
+            self.cache.record("hits")
+        else:
+            self.cache.record("stale")
+        return entry
+
+    async def _cache_store(self, url: str, product_data: Dict, response: Optional[httpx.Response] = None):
+        if not self.cache:
+            return
+        etag = response.headers.get("etag") if response is not None else None
+        last_modified = response.headers.get("last-modified") if response is not None else None
+        await asyncio.to_thread(self.cache.put, url, product_data, etag, last_modified)
+
+    async def _scrape_http(
+        self,
+        url: str,
+        entry: Optional[CacheEntry],
+        timings: Dict[str, float],
+    ) -> Optional[Tuple[Dict, str]]:
+        headers = entry.revalidation_headers if entry else None
+        try:
+            # A single attempt: the browser is the fallback, but failures count towards the breaker
+            with timed("http_fetch", timings):
+                response = await self.guard.call(
+                    url, lambda: self.fetcher.fetch(url, headers=headers or None), attempts=1
+                )
+            if response.status_code == 304 and entry:
+                self.cache.record("revalidated")
+                await asyncio.to_thread(self.cache.touch, url)
+                return entry.data, "cache"
+            with timed("http_parse", timings):
+                product_data = self.fetcher.parse_product(response, url)
+            await self._cache_store(url, product_data, response)
+            return product_data, "http"
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code in (404, 410):
+                raise ProductGoneError()
+            logger.warning(f"HTTP fast path failed for {url}: {str(e)}")
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.info(f"HTTP fast path incomplete for {url}, falling back to browser: {str(e)}")
+        return None
+
+    async def _scrape_browser(self, url: str, load_options: Optional[LoadOptions]) -> Tuple[Dict, Dict]:
+        if self.warmup and not self.warmup.done():
+            # Shielded, a cancelled scrape must not cancel the warm-up
+            await asyncio.shield(self.warmup)
+
+        async def attempt() -> Tuple[Dict, Dict]:
+            # Every attempt gets a fresh page, a crashed context is recycled by the pool
+            async with ProductScraper(pool=self.pool) as scraper:
+                product_data = await scraper.scrape_product(url, load_options)
+                return product_data, scraper.report
+
+        return await self.guard.call(url, attempt)
+
+    async def _verify(self, url: str, product_data: Dict, load_options: Optional[LoadOptions]):
+        """Compare the fast path result with the browser result and log differences"""
+        try:
+            browser_data, _ = await self._scrape_browser(url, load_options)
+        except Exception as e:
+            logger.warning(f"Fast path verification skipped for {url}: {str(e)}")
+            return
+        differences = diff_products(product_data, browser_data)
+        if differences:
+            logger.warning(f"Fast path differs from browser for {url}: {differences}")
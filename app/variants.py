@@ -0,0 +1,259 @@
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# schema.org availability values (the part after the last slash)
+AVAILABLE = frozenset({"InStock", "InStoreOnly", "LimitedAvailability", "OnlineOnly", "PreOrder", "BackOrder"})
+
+GTIN_KEYS = ("gtin13", "gtin", "gtin14", "gtin12", "gtin8", "ean", "barcode")
+SIZE_KEYS = ("size", "groesse", "option1", "title", "name")
+NAME_KEYS = ("title", "name")
+LIST_PRICE_KEYS = ("compare_at_price", "list_price", "old_price", "regular_price")
+STOCK_KEYS = ("inventory_quantity", "stock", "quantity", "inventoryLevel")
+
+NUMBER = re.compile(r"-?\d+(?:[.,]\d+)*")
+
+
+@dataclass(slots=True)
+class Variant:
+    """One size of a product with its identifiers, price and stock state"""
+    size: str
+    sku: str = ""
+    ean: str = ""
+    price: Optional[float] = None
+    sale_price: Optional[float] = None
+    currency: str = "EUR"
+    available: bool = True
+    stock: Optional[int] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "groesse": self.size,
+            "sku": self.sku,
+            "ean": self.ean,
+            "preis": self.price,
+            "sonderpreis": self.sale_price,
+            "waehrung": self.currency,
+            "verfuegbar": self.available,
+            "bestand": self.stock,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Variant":
+        return cls(
+            data.get("groesse", ""),
+            data.get("sku", ""),
+            data.get("ean", ""),
+            data.get("preis"),
+            data.get("sonderpreis"),
+            data.get("waehrung", "EUR"),
+            data.get("verfuegbar", True),
+            data.get("bestand"),
+        )
+
+
+def variants_of(product_data: Dict) -> List[Variant]:
+    """
+    Variants of a product dict; products without variant data (or scraped
+    before variants were extracted) get one available variant per size.
+    """
+    if product_data.get("varianten"):
+        return [Variant.from_dict(variant) for variant in product_data["varianten"]]
+    return [Variant(size) for size in product_data.get("groessen", [])]
+
+
+def _price(value) -> Optional[float]:
+    """Parse 59.95, "59,95", "1.299,00" or "59.95 EUR" into a float"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = NUMBER.search(str(value))
+    if not match:
+        return None
+    number = match.group(0)
+    # The last separator followed by one or two digits is the decimal separator
+    head, separator, tail = max(number.rpartition(","), number.rpartition("."), key=lambda p: len(p[0]))
+    if separator and len(tail) <= 2:
+        return float(re.sub(r"[.,]", "", head) + "." + tail)
+    return float(re.sub(r"[.,]", "", number))
+
+
+def _cents(value) -> Optional[float]:
+    """Price of a shop product JSON, where integers are cents (5995 is 59.95)"""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value / 100
+    return _price(value)
+
+
+def _value(data: Dict, keys):
+    for key in keys:
+        value = data.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _first(data: Dict, keys) -> str:
+    value = _value(data, keys)
+    return "" if value is None else str(value).strip()
+
+
+def _available(value) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value:
+        return value.rstrip("/").rsplit("/", 1)[-1] in AVAILABLE
+    return None
+
+
+def _stock(data: Dict) -> Optional[int]:
+    for key in STOCK_KEYS:
+        value = data.get(key)
+        if isinstance(value, dict):
+            value = value.get("value")
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _size(data: Dict, sizes: List[str], loose: bool = False) -> str:
+    """
+    Size of a variant. Names and titles only count when they contain one of
+    the sizes shown on the page, or with ``loose`` when no sizes are known.
+    """
+    for key in SIZE_KEYS:
+        value = data.get(key)
+        if not isinstance(value, str) or not value.strip():
+            continue
+        value = value.strip()
+        if key not in NAME_KEYS or value in sizes or (loose and not sizes):
+            return value
+        # Offer names such as "Kleid Blumenwiese - M"
+        for size in sizes:
+            if re.search(rf"(^|[\s/\-(]){re.escape(size)}($|[\s/)])", value):
+                return size
+    return ""
+
+
+def _offers(data: Dict) -> List[Dict]:
+    offers = data.get("offers") or []
+    if isinstance(offers, dict):
+        # AggregateOffer lists the single offers under "offers"
+        offers = offers.get("offers") or [offers]
+    return [offer for offer in offers if isinstance(offer, dict)]
+
+
+def _schema_offer(product: Dict, offer: Dict, sizes: List[str]) -> Variant:
+    list_price = None
+    specifications = offer.get("priceSpecification") or []
+    for specification in specifications if isinstance(specifications, list) else [specifications]:
+        if isinstance(specification, dict) and "StrikethroughPrice" in str(specification.get("priceType", "")):
+            list_price = _price(specification.get("price"))
+    price = _price(offer.get("price", offer.get("lowPrice")))
+    item = offer.get("itemOffered") if isinstance(offer.get("itemOffered"), dict) else {}
+    available = _available(offer.get("availability"))
+    return Variant(
+        size=_size(offer, sizes) or _size(item, sizes) or _size(product, sizes),
+        sku=_first(offer, ("sku",)) or _first(item, ("sku",)) or _first(product, ("sku",)),
+        ean=_first(offer, GTIN_KEYS) or _first(item, GTIN_KEYS) or _first(product, GTIN_KEYS),
+        price=list_price if list_price and price and list_price > price else price,
+        sale_price=price if list_price and price and list_price > price else None,
+        currency=_first(offer, ("priceCurrency",)) or "EUR",
+        available=True if available is None else available,
+        stock=_stock(offer),
+    )
+
+
+def _schema_variants(data: Dict, sizes: List[str]) -> Iterator[Variant]:
+    """Variants of a schema.org Product (one offer per size) or ProductGroup"""
+    if data.get("hasVariant"):
+        for product in data["hasVariant"]:
+            if isinstance(product, dict):
+                for offer in _offers(product) or [{}]:
+                    yield _schema_offer(product, offer, sizes)
+        return
+    for offer in _offers(data):
+        yield _schema_offer(data, offer, sizes)
+
+
+def _shop_variants(data: Dict, sizes: List[str]) -> Iterator[Variant]:
+    """Variants of a shop product JSON with a "variants" list"""
+    for variant in data["variants"]:
+        if not isinstance(variant, dict):
+            continue
+        price = _cents(variant.get("price"))
+        list_price = _cents(_value(variant, LIST_PRICE_KEYS))
+        available = _available(variant.get("available", variant.get("availability")))
+        stock = _stock(variant)
+        if available is None:
+            available = stock is None or stock > 0
+        yield Variant(
+            size=_size(variant, sizes, loose=True),
+            sku=_first(variant, ("sku", "article_number", "productNumber")),
+            ean=_first(variant, GTIN_KEYS),
+            price=list_price if list_price and price and list_price > price else price,
+            sale_price=price if list_price and price and list_price > price else None,
+            currency=_first(variant, ("currency", "priceCurrency")) or _first(data, ("currency",)) or "EUR",
+            available=available,
+            stock=stock,
+        )
+
+
+def _candidates(data) -> Iterator[Dict]:
+    """Objects in a JSON document that may describe the product"""
+    if isinstance(data, list):
+        for item in data:
+            yield from _candidates(item)
+    elif isinstance(data, dict):
+        if "@graph" in data:
+            yield from _candidates(data["@graph"])
+        elif isinstance(data.get("product"), dict):
+            yield data["product"]
+        else:
+            yield data
+
+
+def parse_variants(scripts: List[str], sizes: Optional[List[str]] = None) -> List[Variant]:
+    """
+    Variants from the JSON embedded in a product page.
+
+    Reads schema.org Product/ProductGroup JSON-LD as well as shop product
+    JSON with a ``variants`` list, in a single pass over the script texts.
+    Variants without a size are dropped, later duplicates of a size are
+    ignored and sizes of the page without variant data are appended.
+    Returns an empty list when the page has no variant data.
+    """
+    sizes = sizes or []
+    variants: Dict[str, Variant] = {}
+    for script in scripts:
+        try:
+            document = json.loads(script)
+        except ValueError:
+            continue
+        for data in _candidates(document):
+            kind = data.get("@type")
+            if isinstance(data.get("variants"), list):
+                found = _shop_variants(data, sizes)
+            elif kind in ("Product", "ProductGroup") or (isinstance(kind, list) and "Product" in kind):
+                found = _schema_variants(data, sizes)
+            else:
+                continue
+            try:
+                for variant in found:
+                    if variant.size and variant.size not in variants:
+                        variants[variant.size] = variant
+            except (TypeError, ValueError, AttributeError) as e:
+                logger.warning(f"Ignoring malformed variant data: {str(e)}")
+    if variants:
+        # Sizes offered on the page but missing from the JSON keep a plain variant
+        for size in sizes:
+            if size not in variants:
+                variants[size] = Variant(size)
+    return list(variants.values())
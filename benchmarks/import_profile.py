@@ -0,0 +1,105 @@
+"""
+Import-time profile of the web process.
+
+Imports ``app.main`` in a fresh interpreter with ``-X importtime`` and
+reports the total import time, the slowest modules and the time per top
+level package. Exits with status 1 when a module that must be imported
+lazily (Playwright, the exporters) is loaded at startup, or when the total
+exceeds ``--budget-ms``, so it can run in CI:
+
+    python -m benchmarks.import_profile --budget-ms 1500
+"""
+from pathlib import Path
+from typing import Dict, List, Optional
+import argparse
+import json
+import re
+import subprocess
+import sys
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Modules the web process must not import before the first request needs them
+LAZY_MODULES = (
+    "playwright",
+    "app.exporters.xml_exporter",
+    "app.exporters.csv_exporter",
+    "app.exporters.feed_exporter",
+)
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def profile(module: str = "app.main") -> List[Dict]:
+    """Self and cumulative import time in microseconds of every module imported by ``module``"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            entries.append({
+                "module": match.group(4),
+                "self_us": int(match.group(1)),
+                "cumulative_us": int(match.group(2)),
+                "depth": len(match.group(3)) // 2,
+            })
+    return entries
+
+
+def report(entries: List[Dict], module: str = "app.main", top: int = 15) -> Dict:
+    total = next((e["cumulative_us"] for e in reversed(entries) if e["module"] == module), 0)
+    packages: Dict[str, int] = {}
+    for entry in entries:
+        package = entry["module"].split(".")[0]
+        packages[package] = packages.get(package, 0) + entry["self_us"]
+    loaded = {entry["module"] for entry in entries}
+    return {
+        "module": module,
+        "total_ms": round(total / 1000, 1),
+        "modules": len(entries),
+        "slowest": [
+            {"module": e["module"], "self_ms": round(e["self_us"] / 1000, 1)}
+            for e in sorted(entries, key=lambda e: e["self_us"], reverse=True)[:top]
+        ],
+        "packages_ms": {
+            name: round(us / 1000, 1)
+            for name, us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+        },
+        "eager_imports": [
+            lazy for lazy in LAZY_MODULES
+            if any(name == lazy or name.startswith(lazy + ".") for name in loaded)
+        ],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main", help="module to import")
+    parser.add_argument("--budget-ms", type=float, help="fail when the import takes longer")
+    parser.add_argument("--top", type=int, default=15, help="number of modules and packages listed")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    result = report(profile(args.module), args.module, args.top)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+
+    failed = False
+    if result["eager_imports"]:
+        print(f"Imported at startup but must be lazy: {', '.join(result['eager_imports'])}", file=sys.stderr)
+        failed = True
+    if args.budget_ms is not None and result["total_ms"] > args.budget_ms:
+        print(f"Import of {args.module} took {result['total_ms']} ms, budget {args.budget_ms} ms", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""
+Offline benchmark of the scrape pipeline and the exporters.
+
+Serves the recorded product pages in ``benchmarks/fixtures`` from a local stub
+server, runs the scraper against them and writes the results as JSON so they
+can be compared between commits:
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --skip-browser --export-sizes 1 1000
+"""
+from pathlib import Path
+from typing import Callable, Dict, List
+import argparse
+import asyncio
+import json
+import platform
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from app.browser_pool import BrowserPool
+from app.categories import get_category_mapper
+from app.exporters import CSVExporter, GoogleFeedExporter, XMLExporter
+from app.extraction import extract_fields
+from app.http_fetcher import HTTPProductFetcher
+from app.http_fetcher import parse_fields
+from app.resource_blocking import LoadOptions, RequestBlocker
+from app.sanitizer import html_to_text, sanitize_html
+from app.scraper import ProductScraper
+from app.service import ScrapeService
+
+from .stub_server import FIXTURES_DIR, StubShopServer
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def _summary(samples: List[float]) -> Dict:
+    """Timing summary in milliseconds"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": _ms(statistics.fmean(ordered)),
+        "p50_ms": _ms(ordered[len(ordered) // 2]),
+        "p95_ms": _ms(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]),
+        "max_ms": _ms(ordered[-1]),
+    }
+
+
+def _peak_rss_mb() -> Dict:
+    # ru_maxrss is reported in KiB on Linux; children covers Chromium
+    to_mb = 1 / 1024 if sys.platform != "darwin" else 1 / (1024 * 1024)
+    return {
+        "self_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * to_mb, 1),
+        "children_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * to_mb, 1),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+async def bench_browser_phases(urls: List[str], rounds: int, mode: str) -> Dict:
+    """Time every phase of a browser scrape separately"""
+    phases: Dict[str, List[float]] = {
+        "lease": [], "goto": [], "selector_wait": [], "extract": [], "build": [],
+    }
+    started = time.perf_counter()
+    pool = BrowserPool(size=1)
+    await pool.start()
+    launch = time.perf_counter() - started
+    load_options = LoadOptions(mode=mode)
+    blocked = allowed = 0
+    try:
+        for _ in range(rounds):
+            for url in urls:
+                t0 = time.perf_counter()
+                async with pool.lease() as page:
+                    t1 = time.perf_counter()
+                    blocker = RequestBlocker(load_options)
+                    await blocker.install(page)
+                    await page.goto(url, wait_until=load_options.wait_until)
+                    t2 = time.perf_counter()
+                    await page.wait_for_selector('[data-product-id]')
+                    t3 = time.perf_counter()
+                    extracted = await extract_fields(page)
+                    t4 = time.perf_counter()
+                    ProductScraper.build_product(extracted["values"], url)
+                    t5 = time.perf_counter()
+                phases["lease"].append(t1 - t0)
+                phases["goto"].append(t2 - t1)
+                phases["selector_wait"].append(t3 - t2)
+                phases["extract"].append(t4 - t3)
+                phases["build"].append(t5 - t4)
+                blocked += blocker.blocked
+                allowed += blocker.allowed
+    finally:
+        await pool.close()
+    return {
+        "mode": mode,
+        "browser_launch_ms": _ms(launch),
+        "phases": {name: _summary(samples) for name, samples in phases.items()},
+        "requests_blocked": blocked,
+        "requests_allowed": allowed,
+    }
+
+
+async def bench_throughput(service: ScrapeService, urls: List[str], concurrency: int, total: int) -> Dict:
+    """Scrape ``total`` URLs with ``concurrency`` parallel requests"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(url: str):
+        nonlocal errors
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                await service.scrape(url, LoadOptions(mode="fast"))
+                latencies.append(time.perf_counter() - t0)
+            except Exception:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(urls[i % len(urls)]) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency": _summary(latencies),
+    }
+
+
+async def bench_paths(urls: List[str], concurrency_levels: List[int], total: int, skip_browser: bool) -> Dict:
+    results: Dict = {}
+    async with HTTPProductFetcher() as fetcher:
+        service = ScrapeService(fetcher=fetcher)
+        results["http"] = [await bench_throughput(service, urls, c, total) for c in concurrency_levels]
+
+    if not skip_browser:
+        pool = BrowserPool(size=max(concurrency_levels))
+        await pool.start()
+        try:
+            service = ScrapeService(pool=pool)
+            results["browser"] = [await bench_throughput(service, urls, c, total) for c in concurrency_levels]
+        finally:
+            await pool.close()
+    return results
+
+
+def _time(func: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def bench_exporters(product: Dict, sizes: List[int]) -> Dict:
+    """Time the exporters for catalogues of ``sizes`` products"""
+    results = {}
+    for size in sizes:
+        products = [dict(product, artikelnummer=f"{product['artikelnummer']}-{i}") for i in range(size)]
+        results[str(size)] = {
+            "xml_ms": _ms(_time(lambda: [XMLExporter.generate_xml(p) for p in products])),
+            "csv_single_ms": _ms(_time(lambda: [CSVExporter.generate_csv(p) for p in products])),
+            "csv_stream_ms": _ms(_time(lambda: sum(len(c) for c in CSVExporter.stream_csv(products)))),
+            "csv_stream_gzip_ms": _ms(_time(lambda: sum(len(c) for c in CSVExporter.stream_csv(products, compress=True)))),
+            "feed_ms": _ms(_time(lambda: sum(len(c) for c in GoogleFeedExporter.generate_feed(products)))),
+        }
+    return results
+
+
+def _legacy_clean_html(html: str) -> str:
+    """The regex cleanup that sanitize_html replaced, kept for comparison"""
+    if not html:
+        return ""
+    html = re.sub(r'<script[^>]*>.*?</script>', '', html, flags=re.DOTALL)
+    html = re.sub(r'<style[^>]*>.*?</style>', '', html, flags=re.DOTALL)
+    html = re.sub(r'<!--.*?-->', '', html, flags=re.DOTALL)
+    return re.sub(r'\s+', ' ', html).strip()
+
+
+def bench_sanitizer(repeat: int) -> Dict:
+    """
+    Compare sanitize_html with the legacy regex cleanup on large details and
+    on unclosed comments and scripts, which make the regexes backtrack.
+    Both must agree on the recorded fixture pages.
+    """
+    fixtures = [
+        parse_fields(path.read_text(encoding="utf-8"), "http://localhost/")["values"]["details"]
+        for path in sorted(FIXTURES_DIR.glob("*.html"))
+    ]
+    inputs = {
+        "fixtures_x%d" % repeat: "\n".join(fixtures) * repeat,
+        "unclosed_comments": "<p>Text <!-- offen " * repeat,
+        "unclosed_scripts": "<script>var a = 1;" * repeat,
+    }
+    results: Dict = {"matches_legacy": all(sanitize_html(d) == _legacy_clean_html(d) for d in fixtures)}
+    for name, html in inputs.items():
+        results[name] = {
+            "input_kb": round(len(html) / 1024, 1),
+            "legacy_ms": _ms(_time(lambda: _legacy_clean_html(html))),
+            "sanitize_ms": _ms(_time(lambda: sanitize_html(html))),
+            "plain_text_ms": _ms(_time(lambda: html_to_text(html))),
+        }
+    return results
+
+
+def bench_categories(count: int) -> Dict:
+    """Classify ``count`` distinct breadcrumbs, then the same ones again from the memo"""
+    mapper = get_category_mapper()
+    breadcrumbs = [f"Damen > Kollektion {i} > Blusenkleider" for i in range(count)]
+    return {
+        "breadcrumbs": count,
+        "cold_ms": _ms(_time(lambda: [mapper.classify(b) for b in breadcrumbs])),
+        "memoized_ms": _ms(_time(lambda: [mapper.classify(b) for b in breadcrumbs])),
+    }
+
+
+async def run(args) -> Dict:
+    report: Dict = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "created_at": time.time(),
+    }
+    with StubShopServer(latency=args.latency) as server:
+        urls = server.urls
+        async with HTTPProductFetcher() as fetcher:
+            sample = await fetcher.scrape_product(urls[0])
+
+        if args.skip_browser:
+            report["browser_phases"] = {"skipped": True}
+        else:
+            try:
+                report["browser_phases"] = {
+                    mode: await bench_browser_phases(urls, args.rounds, mode) for mode in ("fast", "full")
+                }
+            except Exception as e:
+                # Chromium missing or not launchable on this machine
+                report["browser_phases"] = {"error": str(e).splitlines()[0]}
+                args.skip_browser = True
+
+        report["throughput"] = await bench_paths(urls, args.concurrency, args.requests, args.skip_browser)
+
+    report["exporters"] = bench_exporters(sample, args.export_sizes)
+    report["categories"] = bench_categories(max(args.export_sizes))
+    report["sanitizer"] = bench_sanitizer(args.sanitizer_repeat)
+    report["peak_rss"] = _peak_rss_mb()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline scraper benchmark")
+    parser.add_argument("--output", type=Path, help="write the JSON report to this file")
+    parser.add_argument("--rounds", type=int, default=3, help="rounds over all fixtures for the phase timings")
+    parser.add_argument("--requests", type=int, default=20, help="requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--export-sizes", type=int, nargs="+", default=[1, 1000, 10000])
+    parser.add_argument("--sanitizer-repeat", type=int, default=2000, help="size factor of the sanitizer inputs")
+    parser.add_argument("--latency", type=float, default=0.0, help="artificial stub server latency in seconds")
+    parser.add_argument("--skip-browser", action="store_true", help="only benchmark the HTTP path")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict
+import threading
+import time
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# 1x1 transparent GIF served for every gallery image
+PIXEL = bytes.fromhex("47494638396101000100800000000000ffffff21f90401000000002c00000000010001000002024401003b")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    pages: Dict[str, bytes] = {}
+    latency = 0.0
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        path = self.path.split("?", 1)[0]
+        if path in self.pages:
+            self._send(200, "text/html; charset=utf-8", self.pages[path])
+        elif path.startswith("/media/"):
+            self._send(200, "image/gif", PIXEL)
+        elif path.startswith("/assets/"):
+            self._send(200, "text/plain", b"")
+        else:
+            self._send(404, "text/plain", b"not found")
+
+    def _send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubShopServer:
+    """
+    Serves the recorded product pages from ``fixtures/`` on localhost.
+
+    ``fixtures/kleid.html`` is available at ``/de/kleid``; gallery images and
+    assets are answered with tiny placeholder bodies.
+    """
+
+    def __init__(self, latency: float = 0.0, port: int = 0):
+        handler = type("Handler", (_Handler,), {
+            "pages": {f"/de/{path.stem}": path.read_bytes() for path in sorted(FIXTURES_DIR.glob("*.html"))},
+            "latency": latency,
+        })
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self.pages = sorted(handler.pages)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def urls(self):
+        return [self.base_url + page for page in self.pages]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
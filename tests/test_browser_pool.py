@@ -0,0 +1,68 @@
+import asyncio
+
+from app.browser_pool import BrowserPool, playwright_api
+from app.resilience import TransientScrapeError
+
+
+class FakePage:
+    def set_default_timeout(self, timeout):
+        pass
+
+    async def close(self):
+        pass
+
+
+class FakeContext:
+    closed = False
+
+    async def new_page(self):
+        return FakePage()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def is_connected(self):
+        return True
+
+    async def new_context(self, **options):
+        return FakeContext()
+
+
+def _pool() -> BrowserPool:
+    pool = BrowserPool(size=1)
+    pool._playwright = object()
+    pool._browser = FakeBrowser()
+    return pool
+
+
+async def _lease_raising(pool: BrowserPool, error: Exception):
+    try:
+        async with pool.lease():
+            raise error
+    except type(error):
+        pass
+
+
+def test_context_is_recycled_after_a_page_load_timeout():
+    async def run():
+        pool = _pool()
+        try:
+            raise TransientScrapeError("Timeout") from playwright_api().TimeoutError("goto")
+        except TransientScrapeError as e:
+            await _lease_raising(pool, e)
+        assert pool.stats()["recycled_crash"] == 1
+        assert pool.stats()["idle"] == 0
+
+    asyncio.run(run())
+
+
+def test_context_is_kept_after_a_retryable_status():
+    async def run():
+        pool = _pool()
+        await _lease_raising(pool, TransientScrapeError("503"))
+        assert pool.stats()["recycled_crash"] == 0
+        assert pool.stats()["idle"] == 1
+
+    asyncio.run(run())
@@ -0,0 +1,60 @@
+import pytest
+
+from app import cache as cache_module
+from app.cache import ProductCache
+
+URL = "https://www.blutsgeschwister.de/de/kleid-{}"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = ProductCache(str(tmp_path / "cache.sqlite3"), ttl=60, max_entries=2)
+    yield cache
+    cache.close()
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    cache.put(URL.format(1), {"artikelnummer": "1"})
+    cache.put(URL.format(2), {"artikelnummer": "2"})
+    assert cache.get(URL.format(1)) is not None
+    cache.put(URL.format(3), {"artikelnummer": "3"})
+
+    assert cache.get(URL.format(2)) is None
+    assert cache.get(URL.format(1)).data == {"artikelnummer": "1"}
+    assert cache.get(URL.format(3)).data == {"artikelnummer": "3"}
+    assert cache.stats()["evicted"] == 1
+    assert cache.stats()["entries"] == 2
+
+
+def test_entry_is_stale_after_ttl_until_touched(cache, clock):
+    cache.put(URL.format(1), {"artikelnummer": "1"}, etag='"v1"')
+    assert cache.get(URL.format(1)).is_fresh(cache.ttl)
+
+    clock.now += 120
+    entry = cache.get(URL.format(1))
+    assert not entry.is_fresh(cache.ttl)
+    assert entry.revalidation_headers == {"If-None-Match": '"v1"'}
+
+    cache.touch(URL.format(1))
+    assert cache.get(URL.format(1)).is_fresh(cache.ttl)
+
+
+def test_tracking_parameters_share_one_entry(cache):
+    cache.put(URL.format(1) + "/?utm_source=newsletter", {"artikelnummer": "1"})
+    assert cache.get(URL.format(1)).data == {"artikelnummer": "1"}
@@ -0,0 +1,40 @@
+import pytest
+
+from app.categories import CategoryMapper
+
+CLOTHING = "Apparel & Accessories > Clothing"
+
+
+@pytest.fixture(scope="module")
+def mapper():
+    return CategoryMapper.from_file()
+
+
+@pytest.mark.parametrize("breadcrumb, category", [
+    ("Damen > Kleider", "Apparel & Accessories > Clothing > Dresses"),
+    ("Damen > Sommerkleid", "Apparel & Accessories > Clothing > Dresses"),
+    ("Damen > Rockabilly > Petticoat-Kleid", "Apparel & Accessories > Clothing > Dresses"),
+    ("Damen > Jeansrock", "Apparel & Accessories > Clothing > Skirts"),
+    ("Damen > Strickjacke", "Apparel & Accessories > Clothing > Jackets"),
+    ("Damen > Latzhosen", "Apparel & Accessories > Clothing > One-Pieces > Jumpsuits & Rompers"),
+    ("Damen > Tops & Shirts", "Apparel & Accessories > Clothing > Shirts & Tops"),
+    ("Accessoires > Tücher", "Apparel & Accessories > Clothing Accessories > Scarves & Shawls"),
+])
+def test_keywords_match_words_and_compound_heads(mapper, breadcrumb, category):
+    assert mapper.classify(breadcrumb) == category
+
+
+@pytest.mark.parametrize("breadcrumb", [
+    "Damen > Kleidung > Sale",
+    "Bekleidung > Neuheiten",
+    "Damen > Rockabilly",
+    "Wohnen > Handtuch",
+    "Wohnen > Handtücher",
+    "Desktop",
+])
+def test_keyword_inside_other_words_is_ignored(mapper, breadcrumb):
+    assert mapper.classify(breadcrumb) == CLOTHING
+
+
+def test_empty_breadcrumb_uses_default(mapper):
+    assert mapper.classify("") == CLOTHING
@@ -0,0 +1,103 @@
+import csv
+import io
+
+import pytest
+
+from app.changes import RunStore, comparable_base, delta_products, diff_runs, field_changes, product_fingerprint
+from app.exporters.csv_exporter import CSVExporter
+
+GALLERY = ["https://cdn.example.com/a.jpg", "https://cdn.example.com/b.jpg"]
+
+
+def _product(**fields) -> dict:
+    product = {
+        "artikelnummer": "BG-1",
+        "name": "Kleid Blumenwiese",
+        "url": "https://www.blutsgeschwister.de/de/kleid",
+        "groessen": ["S", "M"],
+        "bilder": GALLERY,
+        "bilder_quelle": GALLERY,
+    }
+    product.update(fields)
+    return product
+
+
+def test_refused_image_is_not_a_change():
+    previous = _product()
+    current = _product(bilder=GALLERY[:1])
+    assert product_fingerprint(previous) == product_fingerprint(current)
+    assert diff_runs([previous], [current])["unchanged"] == 1
+
+
+def test_changed_gallery_is_reported_as_images():
+    previous = _product()
+    current = _product(bilder=GALLERY[:1], bilder_quelle=GALLERY[:1], groessen=["S"])
+    assert product_fingerprint(previous) != product_fingerprint(current)
+    assert field_changes(previous, current) == {
+        "bilder": {"added": [], "removed": GALLERY[1:]},
+        "groessen": {"added": [], "removed": ["M"]},
+    }
+
+
+def _run_product(number: str, **fields) -> dict:
+    return _product(artikelnummer=number, url=f"https://www.blutsgeschwister.de/de/{number}", **fields)
+
+
+@pytest.fixture
+def runs(tmp_path):
+    runs = RunStore(str(tmp_path / "runs.sqlite3"))
+    yield runs
+    runs.close()
+
+
+def _compare(runs: RunStore, base: str, run: str):
+    current = runs.products(run)
+    requested, gone = runs.scope(run)
+    return comparable_base(runs.products(base), current, requested, gone), current
+
+
+def test_diff_covers_requested_urls_only(runs):
+    runs.record("a", [_run_product("1"), _run_product("2"), _run_product("3")])
+    runs.record(
+        "b", [_run_product("1", name="Kleid Sonnenblume"), _run_product("4")],
+        failed=["https://www.blutsgeschwister.de/de/2/?utm_source=mail"],
+    )
+
+    requested, gone = runs.scope("b")
+    assert requested == {f"https://www.blutsgeschwister.de/de/{number}" for number in ("1", "2", "4")}
+    assert gone == set()
+    # The failed URL keeps its product from run a, URL 3 was not requested
+    assert [product["artikelnummer"] for product in runs.products("b")] == ["1", "4", "2"]
+
+    previous, current = _compare(runs, "a", "b")
+    diff = diff_runs(previous, current)
+    assert diff["added"] == ["4"]
+    assert diff["removed"] == []
+    assert diff["changed"] == {"1": {"name": {"old": "Kleid Blumenwiese", "new": "Kleid Sonnenblume"}}}
+    assert diff["unchanged"] == 1
+
+
+def test_only_gone_pages_are_removed(runs):
+    runs.record("a", [_run_product("1"), _run_product("2")])
+    runs.record("b", [], failed=["https://www.blutsgeschwister.de/de/1"],
+                gone=["https://www.blutsgeschwister.de/de/2"])
+
+    previous, current = _compare(runs, "a", "b")
+    assert diff_runs(previous, current)["removed"] == ["2"]
+
+
+def test_delta_rows_for_changed_added_and_removed_products(runs):
+    runs.record("a", [_run_product("1"), _run_product("2")])
+    runs.record("b", [_run_product("1", groessen=["S"]), _run_product("3")],
+                gone=["https://www.blutsgeschwister.de/de/2"])
+
+    previous, current = _compare(runs, "a", "b")
+    assert [product["artikelnummer"] for product in delta_products(previous, current)] == ["1", "3"]
+
+    text = b"".join(CSVExporter.stream_csv(current, previous=previous)).decode("utf-8")
+    rows = [(row[4], row[12]) for row in csv.reader(io.StringIO(text), delimiter=";")][1:]
+    assert rows == [
+        ("1", "1"), ("1-S", "1"), ("1-M", "0"),
+        ("3", "1"), ("3-S", "1"), ("3-M", "1"),
+        ("2", "0"),
+    ]
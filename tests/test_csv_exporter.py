@@ -0,0 +1,70 @@
+import csv
+import io
+
+from app.exporters.csv_exporter import CSVExporter
+
+# Header of the JTL-Wawi import as written before variants and prices existed
+JTL_HEADER = (
+    "VaterartikelNr;cHAN;fLagerbestandeigen;cbarcode;cArtNr;cName;cBeschreibung;cFirma;"
+    "cHerstellerName;Attributgruppe;Attributname;Attributwert;Shopaktiv;Shop;IstVaterArtikel;kVaterartikel\r\n"
+)
+
+PRODUCT = {
+    "artikelnummer": "BG-1",
+    "name": "Kleid Blumenwiese",
+    "details": "<p>Baumwolle</p>",
+    "groessen": ["S", "M"],
+    "varianten": [
+        {"groesse": "S", "sku": "BG-1-S", "ean": "4012345000017", "preis": 79.95, "sonderpreis": 59.95,
+         "waehrung": "EUR", "verfuegbar": True, "bestand": 3},
+        {"groesse": "M", "sku": "BG-1-M", "ean": "4012345000024", "preis": 79.95, "sonderpreis": None,
+         "waehrung": "EUR", "verfuegbar": False, "bestand": None},
+    ],
+}
+
+
+def _rows(products, **options):
+    text = b"".join(CSVExporter.stream_csv(products, **options)).decode("utf-8")
+    return text, list(csv.reader(io.StringIO(text), delimiter=";"))
+
+
+def test_header_is_byte_identical_to_the_jtl_import():
+    text, _ = _rows([PRODUCT])
+    assert text.startswith(JTL_HEADER)
+    assert CSVExporter.generate_csv({"artikelnummer": "BG-1"}).startswith(JTL_HEADER)
+
+
+def test_single_product_csv_is_unchanged():
+    product = {"artikelnummer": "BG-1", "name": "Kleid", "details": "<p>Baumwolle</p>", "groessen": ["S", "M"]}
+    assert CSVExporter.generate_csv(product) == JTL_HEADER + (
+        "BG-1;;1;;BG-1;Kleid;<p>Baumwolle</p>;Blutsgeschwister;Blutsgeschwister;Größe;Größe;S, M;1;"
+        "Blutsgeschwister;1;\r\n"
+    )
+
+
+def test_father_and_child_rows():
+    _, (header, father, small, medium) = _rows([PRODUCT])
+    assert len(header) == len(father) == len(small) == 16
+    assert father == [
+        "BG-1", "", "1", "", "BG-1", "Kleid Blumenwiese", "<p>Baumwolle</p>", "Blutsgeschwister",
+        "Blutsgeschwister", "Größe", "Größe", "S, M", "1", "Blutsgeschwister", "1", "",
+    ]
+    assert small == [
+        "BG-1", "BG-1-S", "3", "4012345000017", "BG-1-S", "Kleid Blumenwiese S", "", "Blutsgeschwister",
+        "Blutsgeschwister", "Größe", "Größe", "S", "1", "Blutsgeschwister", "0", "BG-1",
+    ]
+    assert medium[1:5] == ["BG-1-M", "0", "4012345000024", "BG-1-M"]
+
+
+def test_prices_append_two_columns():
+    _, (header, father, small, medium) = _rows([PRODUCT], prices=True)
+    assert header[16:] == ["fVKBrutto", "fSonderpreisBrutto"]
+    assert father[16:] == ["79,95", ""]
+    assert small[16:] == ["79,95", "59,95"]
+    assert medium[16:] == ["79,95", ""]
+
+
+def test_products_without_variants_get_one_child_per_size():
+    product = {"artikelnummer": "BG-2", "name": "Rock", "groessen": ["S", "M"]}
+    _, (_, _, small, medium) = _rows([product])
+    assert [small[4], small[2], medium[4], medium[2]] == ["BG-2-S", "1", "BG-2-M", "1"]
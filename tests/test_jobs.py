@@ -0,0 +1,45 @@
+import pytest
+
+from app.jobs import JobQueue
+
+URL = "https://www.blutsgeschwister.de/de/kleid"
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    yield queue
+    queue.close()
+
+
+def test_late_result_of_a_requeued_job_is_ignored(queue):
+    job = queue.enqueue(URL, max_retries=1)
+    queue.claim("worker-a", lease=-1)
+    assert queue.requeue_expired() == 1
+    queue.claim("worker-b")
+
+    assert not queue.complete(job["job_id"], "worker-a", {"artikelnummer": "1"}, {})
+    assert queue.fail(job["job_id"], "worker-a", "Timeout") is None
+    assert queue.get(job["job_id"])["status"] == "running"
+
+    assert queue.complete(job["job_id"], "worker-b", {"artikelnummer": "1"}, {})
+    assert not queue.complete(job["job_id"], "worker-b", {"artikelnummer": "2"}, {})
+    assert queue.get(job["job_id"])["product"] == {"artikelnummer": "1"}
+
+
+def test_failed_attempt_is_retried_then_failed(queue):
+    job = queue.enqueue(URL, max_retries=1)
+    queue.claim("worker-a")
+    assert queue.fail(job["job_id"], "worker-a", "Timeout") == "queued"
+    queue.claim("worker-a")
+    assert queue.fail(job["job_id"], "worker-a", "Timeout") == "failed"
+
+
+def test_completed_product_is_stored_once(queue):
+    job = queue.enqueue(URL)
+    assert not queue.mark_stored(job["job_id"])
+    queue.claim("worker-a")
+    queue.complete(job["job_id"], "worker-a", {"artikelnummer": "1"}, {})
+    assert queue.mark_stored(job["job_id"])
+    assert not queue.mark_stored(job["job_id"])
+    assert queue.get(job["job_id"])["stored_at"] is not None
@@ -0,0 +1,30 @@
+import asyncio
+
+from app.resilience import HostGuard
+
+URL = "https://www.blutsgeschwister.de/de/kleid"
+
+
+def test_cancel_while_waiting_for_a_slot_releases_the_trial():
+    async def run():
+        guard = HostGuard()
+        host = guard._host(URL)
+        host.breaker.state = "half_open"
+        host.limiter.limit = 1.0
+        host.limiter.in_flight = 1
+
+        waiting = asyncio.ensure_future(guard.call(URL, lambda: asyncio.sleep(0, "ok")))
+        await asyncio.sleep(0.01)
+        assert host.breaker._trial_running
+        waiting.cancel()
+        try:
+            await waiting
+        except asyncio.CancelledError:
+            pass
+        assert not host.breaker._trial_running
+
+        host.limiter.in_flight = 0
+        assert await guard.call(URL, lambda: asyncio.sleep(0, "ok")) == "ok"
+        assert host.breaker.state == "closed"
+
+    asyncio.run(run())
@@ -0,0 +1,37 @@
+import json
+
+from app.variants import parse_variants
+
+
+def _shop_json(**variant) -> str:
+    return json.dumps({"variants": [dict({"title": "M", "sku": "BG-1-M", "inventory_quantity": 2}, **variant)]})
+
+
+def _json_ld(**offer) -> str:
+    return json.dumps({
+        "@context": "https://schema.org",
+        "@type": "Product",
+        "name": "Kleid Blumenwiese",
+        "offers": [dict({"@type": "Offer", "name": "Kleid Blumenwiese - M", "priceCurrency": "EUR"}, **offer)],
+    })
+
+
+def test_shop_json_integer_prices_are_cents():
+    variant, = parse_variants([_shop_json(price=5995, compare_at_price=7995)], ["M"])
+    assert variant.price == 79.95
+    assert variant.sale_price == 59.95
+
+
+def test_shop_json_decimal_prices_stay_decimal():
+    variant, = parse_variants([_shop_json(price="59,95", compare_at_price=79.95)], ["M"])
+    assert variant.price == 79.95
+    assert variant.sale_price == 59.95
+
+
+def test_schema_org_prices_are_decimal():
+    variant, = parse_variants([_json_ld(price=60, availability="https://schema.org/InStock")], ["M"])
+    assert variant.price == 60.0
+    assert variant.sale_price is None
+
+    variant, = parse_variants([_json_ld(price="59.95")], ["M"])
+    assert variant.price == 59.95